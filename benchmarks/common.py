@@ -0,0 +1,66 @@
+import random
+import statistics
+import time
+
+from src.game.map import Map
+
+TILE = 32
+
+
+def tiled_rows(size, ghosts, seed=0):
+    """Square map of size x size cells built from copies of Map.predefined joined by corridors
+
+    The player starts at the centre of the top-left tile and the requested number of
+    ghosts are spawned on seeded random walkable cells.
+    """
+    if size % TILE:
+        raise ValueError(f"Map size must be a multiple of {TILE}, got {size}")
+    base = Map().predefined
+    tiles = size // TILE
+    rows = []
+    for _ in range(tiles):
+        for row in base:
+            rows.append([2 if cell in (3, 4) else cell for _ in range(tiles) for cell in row])
+
+    # Every tile is walled in, so punch corridors through the seams between neighbours
+    for tile_y in range(tiles):
+        for tile_x in range(tiles):
+            left, top = tile_x * TILE, tile_y * TILE
+            if tile_x + 1 < tiles:
+                for x in range(left + TILE - 2, left + TILE + 1):
+                    rows[top + 15][x] = 2
+            if tile_y + 1 < tiles:
+                for y in range(top + TILE - 1, top + TILE + 1):
+                    rows[y][left + 15] = 2
+
+    rows[15][15] = 3
+    walkable = [(x, y) for y, row in enumerate(rows) for x, cell in enumerate(row) if cell == 2]
+    for x, y in random.Random(seed).sample(walkable, ghosts):
+        rows[y][x] = 4
+    return rows
+
+
+def summarize(samples_ns):
+    """Timing statistics in microseconds for a list of per-call samples in nanoseconds"""
+    ordered = sorted(samples_ns)
+    return {
+        'iterations': len(ordered),
+        'mean_us': statistics.fmean(ordered) / 1000,
+        'median_us': ordered[len(ordered) // 2] / 1000,
+        'p95_us': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] / 1000,
+        'min_us': ordered[0] / 1000,
+    }
+
+
+def measure(func, calls):
+    """Time func(*args) once for every args tuple in calls"""
+    samples = []
+    for args in calls:
+        start = time.perf_counter_ns()
+        func(*args)
+        samples.append(time.perf_counter_ns() - start)
+    return summarize(samples)
+
+
+def result(benchmark, params, **values):
+    return {'benchmark': benchmark, 'params': params, **values}
@@ -0,0 +1,64 @@
+"""Compare two benchmark JSON files and flag regressions
+
+    python -m benchmarks.compare before.json after.json --threshold 0.10
+"""
+import argparse
+import json
+import sys
+
+# Metric used for each benchmark and whether a larger value is better
+METRICS = {
+    'find_path': ('mean_us', False),
+    'replan': ('mean_us', False),
+    'ghost_tick': ('mean_us', False),
+    'draw_map': ('mean_us', False),
+    'navigation_table_build': ('seconds', False),
+    'hierarchical_build': ('seconds', False),
+    'simulation_step': ('steps_per_second', True),
+    'simulation_setup': ('seconds', False),
+    'observation_update': ('mean_us', False),
+    'batched_observation_update': ('mean_us', False),
+    'startup': ('seconds', False),
+    'loss_screen': ('mean_us', False),
+}
+
+
+def _key(entry):
+    return entry['benchmark'], json.dumps(entry['params'], sort_keys=True)
+
+
+def compare(before, after, threshold):
+    """Yield (benchmark, params, old, new, change, regressed) for results present in both runs"""
+    previous = {_key(entry): entry for entry in before['results']}
+    for entry in after['results']:
+        old = previous.get(_key(entry))
+        if old is None or entry['benchmark'] not in METRICS:
+            continue
+        metric, higher_is_better = METRICS[entry['benchmark']]
+        change = (entry[metric] - old[metric]) / old[metric]
+        regressed = -change > threshold if higher_is_better else change > threshold
+        yield entry['benchmark'], entry['params'], old[metric], entry[metric], change, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    regressions = 0
+    for benchmark, params, old, new, change, regressed in compare(before, after, args.threshold):
+        regressions += regressed
+        flag = 'REGRESSION' if regressed else ''
+        print(f"{benchmark:24} {json.dumps(params):70} {old:12.2f} {new:12.2f} {change:+8.1%} {flag}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
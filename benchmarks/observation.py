@@ -0,0 +1,53 @@
+import random
+import time
+
+import numpy as np
+
+from benchmarks.common import tiled_rows, summarize, result
+from src.game.batched import BatchedSimulation
+from src.game.grid import Grid
+from src.game.observation import Observation, BatchedObservation
+from src.game.simulation import Simulation
+
+ACTIONS = [None, (1, 0), (-1, 0), (0, 1), (0, -1)]
+BATCH_GAMES = 256
+
+
+def bench_observation(sizes, ghost_counts, steps, seed):
+    """Observation.update() after every simulation step, with and without the target and path channels"""
+    for size in sizes:
+        for count in ghost_counts:
+            grid = Grid.from_rows(tiled_rows(size, count, seed))
+            for extra in (False, True):
+                rng = random.Random(seed)
+                simulation = Simulation(grid)
+                simulation.reset(seed)
+                observation = Observation(simulation, targets=extra, paths=extra)
+                observation.update()
+                samples = []
+                for _ in range(steps):
+                    simulation.step(rng.choice(ACTIONS))
+                    if simulation.done:
+                        simulation.reset()
+                    start = time.perf_counter_ns()
+                    observation.update()
+                    samples.append(time.perf_counter_ns() - start)
+                params = {'size': size, 'ghosts': count, 'targets_paths': extra}
+                yield result('observation_update', params, **summarize(samples))
+
+
+def bench_batched_observation(sizes, steps, seed):
+    """BatchedObservation.update() for BATCH_GAMES games of the map, after every BatchedSimulation step"""
+    for size in sizes:
+        if size > 64:
+            continue  # The navigation table of a BatchedSimulation is quadratic in the walkable cells
+        batch = BatchedSimulation(BATCH_GAMES, Grid.from_rows(tiled_rows(size, 4, seed)), seed=seed)
+        observation = BatchedObservation(batch, targets=True)
+        rng = np.random.default_rng(seed)
+        samples = []
+        for _ in range(steps):
+            batch.step(rng.integers(-1, 5, BATCH_GAMES))
+            start = time.perf_counter_ns()
+            observation.update()
+            samples.append(time.perf_counter_ns() - start)
+        yield result('batched_observation_update', {'size': size, 'games': BATCH_GAMES}, **summarize(samples))
@@ -0,0 +1,145 @@
+import random
+import time
+
+from benchmarks.common import tiled_rows, measure, summarize, result
+from src.entities.ghost import Ghost, GhostPersonality
+from src.game.grid import Grid
+from src.game.hierarchical import HierarchicalPathFinder
+from src.game.navigation import NavigationTable, TABLE_CELL_LIMIT
+from src.game.pathfinder import PathFinder, IncrementalPathFinder
+
+
+def _pathfinders(grid, walkable):
+    yield 'dijkstra', PathFinder(grid)
+    if len(walkable) <= TABLE_CELL_LIMIT:
+        yield 'table', PathFinder(grid, NavigationTable(grid))
+    yield 'hierarchical', PathFinder(grid, HierarchicalPathFinder(grid))
+
+
+def _cells(grid):
+    walkable, walls = [], []
+    for y in range(grid.height):
+        for x in range(grid.width):
+            (walkable if grid.is_walkable(x, y) else walls).append((x, y))
+    return walkable, walls
+
+
+def _near(grid, start, steps, rng):
+    x, y = start
+    for _ in range(steps):
+        options = [(x + dx, y + dy) for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0))
+                   if grid.is_walkable(x + dx, y + dy)]
+        x, y = rng.choice(options)
+    return x, y
+
+
+def _query_sets(grid, walkable, walls, iterations, rng):
+    half_x, half_y = grid.width // 2, grid.height // 2
+    top_left = [(x, y) for x, y in walkable if x < half_x and y < half_y]
+    bottom_right = [(x, y) for x, y in walkable if x >= half_x and y >= half_y]
+    starts = [rng.choice(walkable) for _ in range(iterations)]
+    return {
+        'random': [(start, rng.choice(walkable)) for start in starts],
+        'near': [(start, _near(grid, start, 6, rng)) for start in starts],
+        'far': [(rng.choice(top_left), rng.choice(bottom_right)) for _ in range(iterations)],
+        'unreachable': [(start, rng.choice(walls)) for start in starts],
+    }
+
+
+def bench_find_path(sizes, iterations, seed):
+    for size in sizes:
+        grid = Grid.from_rows(tiled_rows(size, 0, seed))
+        walkable, walls = _cells(grid)
+        queries = _query_sets(grid, walkable, walls, iterations, random.Random(seed))
+
+        if len(walkable) <= TABLE_CELL_LIMIT:
+            start = time.perf_counter()
+            NavigationTable(grid)
+            yield result('navigation_table_build', {'size': size}, seconds=time.perf_counter() - start)
+        start = time.perf_counter()
+        HierarchicalPathFinder(grid)
+        yield result('hierarchical_build', {'size': size}, seconds=time.perf_counter() - start)
+
+        for mode, pathfinder in _pathfinders(grid, walkable):
+            for distribution, calls in queries.items():
+                params = {'size': size, 'mode': mode, 'distribution': distribution}
+                yield result('find_path', params, **measure(pathfinder.find_path, calls))
+
+
+def _chase(grid, iterations, toggle_every, rng):
+    """(start, goal, toggled cell or None) of a ghost chasing a wandering player on a copy of grid"""
+    grid = grid.copy()
+    pathfinder = PathFinder(grid)
+    ghost, player = grid.ghost_starts[0], grid.player_start
+    calls = []
+    for i in range(iterations):
+        toggle = None
+        if toggle_every and i % toggle_every == 0:
+            x, y = rng.randrange(1, grid.width - 1), rng.randrange(1, grid.height - 1)
+            if (x, y) not in (ghost, player):
+                grid.set_wall(x, y, not grid.is_wall(x, y))
+                toggle = (x, y)
+        calls.append((ghost, player, toggle))
+        path = pathfinder.find_path(ghost, player)
+        if len(path) > 1:
+            ghost = path[1]
+        if player == ghost or not grid.is_walkable(*player):
+            player = grid.random_walkable(rng)
+        else:
+            player = _near(grid, player, 1, rng)
+    return calls
+
+
+def bench_replan(sizes, iterations, seed):
+    """A ghost asking for a path every move while its target wanders and walls toggle, Dijkstra vs D* Lite"""
+    for size in sizes:
+        grid = Grid.from_rows(tiled_rows(size, 1, seed))
+        for toggle_every in (0, 10):
+            calls = _chase(grid, iterations, toggle_every, random.Random(seed))
+            for mode, planner in (('dijkstra', PathFinder), ('incremental', IncrementalPathFinder)):
+                board = grid.copy()
+                pathfinder = planner(board)
+                samples = []
+                for start, goal, toggle in calls:
+                    if toggle is not None:
+                        board.set_wall(*toggle, not board.is_wall(*toggle))
+                    begin = time.perf_counter_ns()
+                    pathfinder.find_path(start, goal)
+                    samples.append(time.perf_counter_ns() - begin)
+                params = {'size': size, 'mode': mode, 'toggle_every': toggle_every}
+                yield result('replan', params, expanded_per_call=pathfinder.expanded / len(calls),
+                             **summarize(samples))
+
+
+def bench_ghost_ai(sizes, ghost_counts, iterations, seed):
+    """Cost of one ghost tick (calculate_move + move) for every ghost of a single personality"""
+    for size in sizes:
+        for count in ghost_counts:
+            grid = Grid.from_rows(tiled_rows(size, count, seed))
+            walkable, _ = _cells(grid)
+            spawns = grid.ghost_starts
+
+            for mode, pathfinder in _pathfinders(grid, walkable):
+                for personality in GhostPersonality:
+                    random.seed(seed)
+                    rng = random.Random(seed)
+                    ghosts = [Ghost(x, y, personality, pathfinder) for x, y in spawns]
+                    for ghost in ghosts:
+                        grid.occupancy.add(ghost)
+
+                    player = (15, 15)
+                    players = []
+                    for _ in range(iterations):
+                        player = _near(grid, player, 1, rng)
+                        players.append(player)
+
+                    def tick(player_x, player_y):
+                        for ghost in ghosts:
+                            dx, dy = ghost.calculate_move(player_x, player_y, grid)
+                            ghost.move(dx, dy, grid)
+
+                    params = {'size': size, 'ghosts': count, 'mode': mode, 'personality': personality.name}
+                    yield result('ghost_tick', params, **measure(tick, players))
+
+                    for ghost in ghosts:
+                        grid.occupancy.remove(ghost)
@@ -0,0 +1,57 @@
+import os
+import random
+import time
+
+from benchmarks.common import tiled_rows, summarize, result
+from benchmarks.simulation import ACTIONS
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+
+def bench_rendering(sizes, ghost_counts, frames, seed):
+    """Frame time of the full-redraw draw_map and of the dirty-rect MapRenderer on an offscreen window
+
+    The window is at most WINDOW_SIZE like the game's, and both follow the player
+    on larger boards, so frame times should not grow with the board.
+    """
+    import pygame
+
+    from src.game.constants import CELL_SIZE, WINDOW_SIZE
+    from src.game.grid import Grid
+    from src.game.simulation import Simulation
+    from src.game.utils import draw_map
+    from src.ui.camera import Camera
+    from src.ui.renderer import MapRenderer
+
+    pygame.display.init()
+    try:
+        for size in sizes:
+            surface = pygame.Surface((min(size * CELL_SIZE, WINDOW_SIZE[0]), min(size * CELL_SIZE, WINDOW_SIZE[1])))
+            for count in ghost_counts:
+                simulation = Simulation(Grid.from_rows(tiled_rows(size, count, seed)), pathfinding='dijkstra')
+                simulation.reset(seed)
+                renderer = MapRenderer(surface, simulation.game_map)
+                camera = Camera.for_board(surface, simulation.game_map)
+                rng = random.Random(seed)
+
+                def draw_full():
+                    player = simulation.player
+                    camera.follow(player.x * CELL_SIZE, player.y * CELL_SIZE)
+                    draw_map(surface, simulation.game_map, camera)
+
+                params = {'size': size, 'ghosts': count}
+                for name, draw in (('full', draw_full),
+                                   ('dirty', lambda: renderer.draw(simulation.game_map))):
+                    renderer.invalidate()
+                    samples = []
+                    for _ in range(frames):
+                        simulation.step(rng.choice(ACTIONS))
+                        if simulation.done:
+                            simulation.reset()
+                            renderer.invalidate()
+                        start = time.perf_counter_ns()
+                        draw()
+                        samples.append(time.perf_counter_ns() - start)
+                    yield result('draw_map', {**params, 'renderer': name}, **summarize(samples))
+    finally:
+        pygame.display.quit()
@@ -0,0 +1,85 @@
+"""Run the benchmark suite and write the results as JSON
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --sizes 32 64 --ghosts 4 32 --only simulation rendering
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.observation import bench_observation, bench_batched_observation
+from benchmarks.pathfinding import bench_find_path, bench_replan, bench_ghost_ai
+from benchmarks.rendering import bench_rendering
+from benchmarks.simulation import bench_simulation, bench_simulation_setup
+from benchmarks.startup import bench_startup, bench_loss_screen
+
+SUITES = ('pathfinding', 'ghost_ai', 'simulation', 'observation', 'rendering', 'startup')
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suites(args):
+    if 'pathfinding' in args.only:
+        yield from bench_find_path(args.sizes, args.iterations, args.seed)
+        yield from bench_replan(args.sizes, args.iterations, args.seed)
+    if 'ghost_ai' in args.only:
+        yield from bench_ghost_ai(args.sizes, args.ghosts, args.iterations, args.seed)
+    if 'simulation' in args.only:
+        yield from bench_simulation(args.sizes, args.ghosts, args.steps, args.seed)
+        yield from bench_simulation_setup(args.sizes, args.seed)
+    if 'observation' in args.only:
+        yield from bench_observation(args.sizes, args.ghosts, args.steps, args.seed)
+        yield from bench_batched_observation(args.sizes, args.steps, args.seed)
+    if 'rendering' in args.only:
+        yield from bench_rendering(args.sizes, args.ghosts, args.frames, args.seed)
+    if 'startup' in args.only:
+        yield from bench_startup(args.launches)
+        yield from bench_loss_screen(args.iterations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pathfinding, ghost AI, simulation and rendering")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[32, 64, 128],
+                        help="square map sizes, multiples of 32")
+    parser.add_argument('--ghosts', type=int, nargs='+', default=[4, 16], help="ghost counts")
+    parser.add_argument('--iterations', type=int, default=200, help="calls per pathfinding / ghost AI benchmark")
+    parser.add_argument('--steps', type=int, default=1000, help="simulation steps per benchmark")
+    parser.add_argument('--frames', type=int, default=200, help="frames per rendering benchmark")
+    parser.add_argument('--launches', type=int, default=10, help="fresh processes started by the startup benchmark")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--output', help="JSON file to write, defaults to stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for entry in run_suites(args):
+        results.append(entry)
+        print(entry['benchmark'], entry['params'], file=sys.stderr)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'revision': _git_revision(),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
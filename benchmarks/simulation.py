@@ -0,0 +1,62 @@
+import random
+import tempfile
+import time
+
+from benchmarks.common import tiled_rows, result
+from src.game.grid import Grid
+from src.game.navcache import NavigationCache
+from src.game.navigation import TABLE_CELL_LIMIT
+from src.game.simulation import Simulation
+
+ACTIONS = [None, (1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+def bench_simulation(sizes, ghost_counts, steps, seed):
+    """Whole-game steps per second without rendering, resetting after every death"""
+    for size in sizes:
+        for count in ghost_counts:
+            grid = Grid.from_rows(tiled_rows(size, count, seed))
+            walkable = grid.walls.count(0)
+            modes = ['dijkstra', 'incremental', 'hierarchical', 'flowfield']
+            if walkable <= TABLE_CELL_LIMIT:
+                modes.append('table')
+
+            for mode in modes:
+                rng = random.Random(seed)
+                actions = [rng.choice(ACTIONS) for _ in range(steps)]
+                simulation = Simulation(grid, pathfinding=mode)
+                simulation.reset(seed)  # builds the navigation table outside the timed loop
+
+                deaths = 0
+                start = time.perf_counter()
+                for action in actions:
+                    simulation.step(action)
+                    if simulation.done:
+                        deaths += 1
+                        simulation.reset()
+                elapsed = time.perf_counter() - start
+
+                params = {'size': size, 'ghosts': count, 'mode': mode}
+                yield result('simulation_step', params, steps=steps, deaths=deaths,
+                             seconds=elapsed, steps_per_second=steps / elapsed)
+
+
+def bench_simulation_setup(sizes, seed):
+    """Seconds from a loaded map to the first reset, building the navigation structures or mapping them from disk"""
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            rows = tiled_rows(size, 4, seed)
+            modes = ['hierarchical']
+            if Grid.from_rows(rows).walls.count(0) <= TABLE_CELL_LIMIT:
+                modes.append('table')
+            for mode in modes:
+                Simulation(Grid.from_rows(rows), mode, cache=NavigationCache(directory)).reset(seed)
+                for cached in (False, True):
+                    grid = Grid.from_rows(rows)
+                    # A fresh cache object, so only the files and not its in-memory entries are reused
+                    cache = NavigationCache(directory) if cached else None
+                    start = time.perf_counter()
+                    Simulation(grid, mode, cache=cache).reset(seed)
+                    grid.walkable.nearest(0, 0)
+                    params = {'size': size, 'mode': mode, 'cached': cached}
+                    yield result('simulation_setup', params, seconds=time.perf_counter() - start)
@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import summarize, result
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+# Runs main.main() in a fresh interpreter and quits from inside the first menu flip
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import main as entry
+imported = time.perf_counter()
+import pygame
+
+first = []
+flip = pygame.display.flip
+
+def first_flip():
+    flip()
+    if not first:
+        first.append(time.perf_counter())
+        pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+pygame.display.flip = first_flip
+sys.argv = ['main.py']
+try:
+    entry.main()
+except SystemExit:
+    pass
+print(json.dumps({'import': imported - start, 'first_menu_frame': first[0] - start}))
+"""
+
+
+def bench_startup(repeats):
+    """Cold start of main.py in a new process: imports, time to the first menu frame and whole process"""
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    samples = {'import': [], 'first_menu_frame': [], 'process': []}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', _CHILD], cwd=ROOT, env=env, capture_output=True,
+                                text=True, check=True).stdout
+        samples['process'].append(time.perf_counter() - start)
+        for phase, seconds in json.loads(output.strip().splitlines()[-1]).items():
+            samples[phase].append(seconds)
+
+    for phase, values in samples.items():
+        values.sort()
+        yield result('startup', {'phase': phase}, repeats=repeats, seconds=values[len(values) // 2],
+                     min_seconds=values[0])
+
+
+def bench_loss_screen(iterations):
+    """Time from a death to the loss screen being drawn: building a LossScreen and drawing its first frame"""
+    import pygame
+
+    from src.ui import assets
+    from src.ui.screens import LossScreen
+
+    pygame.display.init()
+    pygame.font.init()
+    try:
+        screen = pygame.display.set_mode((640, 640))
+        for cache in ('cold', 'warm'):
+            samples = []
+            for _ in range(iterations):
+                if cache == 'cold':
+                    assets.clear()
+                start = time.perf_counter_ns()
+                LossScreen(screen).draw()
+                samples.append(time.perf_counter_ns() - start)
+            yield result('loss_screen', {'cache': cache}, **summarize(samples))
+    finally:
+        pygame.quit()
+        # Later suites in this process would otherwise get fonts and surfaces of the closed display
+        assets.clear()
@@ -1,21 +1,42 @@
+import argparse
 import sys
 
 import pygame
 
-from src.game.constants import WINDOW_SIZE, FPS
-from src.game.game import Game
-from src.ui.screens import Menu  # Updated import
+from src.game.constants import CELL_SIZE, FPS, WINDOW_SIZE
+from src.game.map import Map, load_map
+from src.ui.screens import Menu
 
-pygame.init()
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pacman")
+    parser.add_argument('--map', help="map file written by save_map or python -m src.game.generator")
+    parser.add_argument('--record', help="write each game to this file for python -m src.game.replay")
+    parser.add_argument('--trace', help="profile every frame and write a Chrome trace JSON to this file")
+    parser.add_argument('--spectate', type=int, metavar='PORT',
+                        help="stream games to spectators on this port, see python -m src.game.spectator watch")
+    parser.add_argument('--spectate-host', default='127.0.0.1', help="address the spectator server listens on")
+    args = parser.parse_args(argv)
 
-def main():
-    screen = pygame.display.set_mode(WINDOW_SIZE)
+    # Only the subsystems the game uses; pygame.init() would also open audio and joysticks
+    pygame.display.init()
+    pygame.font.init()
+
+    game_map = load_map(args.map) if args.map else Map().grid()
+    # Boards larger than the window scroll with the player, see MapRenderer
+    screen = pygame.display.set_mode((min(game_map.width * CELL_SIZE, WINDOW_SIZE[0]),
+                                      min(game_map.height * CELL_SIZE, WINDOW_SIZE[1])))
     pygame.display.set_caption("Pacman")
     clock = pygame.time.Clock()
 
     menu = Menu(screen)
     running = True
+    spectators = None
+    if args.spectate is not None:
+        from src.game.spectator import SpectatorServer
+
+        spectators = SpectatorServer(args.spectate_host, args.spectate)
+        spectators.start_in_thread()
 
     while running:
         menu.draw()
@@ -27,7 +48,10 @@ def main():
 
             choice = menu.handle_input(event)
             if choice == 'Start Game':
-                game_loop = Game(screen, clock)
+                # Imported on first use, so the simulation and pathfinding modules do not delay the menu
+                from src.game.game import Game
+
+                game_loop = Game(screen, clock, game_map, args.record, args.trace, spectators)
                 result = game_loop.run()
                 if result == 'retry':
                     continue
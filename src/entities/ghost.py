@@ -1,28 +1,26 @@
 import random
-from enum import Enum
 
+from src.entities.personality import GhostPersonality
+from src.game.constants import GHOST_SPEED
 from src.game.pathfinder import PathFinder
 
 
-class GhostPersonality(Enum):
-    CHASER = 1
-    AMBUSHER = 2
-    RANDOM = 3
-    FLANKER = 4
-
-
 class Ghost:
-    def __init__(self, x, y, personality):
+    def __init__(self, x, y, personality, pathfinder=None, flow_fields=None, speed=GHOST_SPEED, rng=None):
         self.x = x
         self.y = y
         self.personality = personality
+        self.speed = speed
+        # Per-game random stream, so a game replays exactly from its seed
+        self.rng = rng or random
         self.target_x = 0
         self.target_y = 0
         self.current_path = []
         self.path_update_counter = 0
-        self.current_cell = 2
         self.stuck_counter = 0
         self.last_position = (x, y)
+        self.pathfinder = pathfinder
+        self.flow_fields = flow_fields
 
     def calculate_move(self, player_x, player_y, game_map):
         current_pos = (self.x, self.y)
@@ -39,12 +37,10 @@ class Ghost:
                 neighbors = []
                 for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
                     new_x, new_y = self.x + dx, self.y + dy
-                    if (0 <= new_x < len(game_map[0]) and
-                            0 <= new_y < len(game_map) and
-                            game_map[new_y][new_x] != 1):
+                    if game_map.is_walkable(new_x, new_y):
                         neighbors.append((new_x, new_y))
                 if neighbors:
-                    self.target_x, self.target_y = random.choice(neighbors)
+                    self.target_x, self.target_y = self.rng.choice(neighbors)
 
         if self.personality == GhostPersonality.CHASER:
             self.target_x, self.target_y = player_x, player_y
@@ -52,13 +48,13 @@ class Ghost:
         elif self.personality == GhostPersonality.AMBUSHER:
             dx = player_x - self.x
             dy = player_y - self.y
-            self.target_x = min(max(0, player_x + (2 if dx > 0 else -2)), len(game_map[0]) - 1)
-            self.target_y = min(max(0, player_y + (2 if dy > 0 else -2)), len(game_map) - 1)
+            # Snapped to a reachable cell, a target on a wall would make every search fail
+            self.target_x, self.target_y = game_map.nearest_walkable(player_x + (2 if dx > 0 else -2),
+                                                                     player_y + (2 if dy > 0 else -2))
 
         elif self.personality == GhostPersonality.RANDOM:
-            if not self.current_path or random.random() < 0.1:
-                self.target_x = random.randint(0, len(game_map[0]) - 1)
-                self.target_y = random.randint(0, len(game_map) - 1)
+            if not self.current_path or self.rng.random() < 0.1:
+                self.target_x, self.target_y = game_map.random_walkable(self.rng)
 
         elif self.personality == GhostPersonality.FLANKER:
             dx = player_x - self.x
@@ -69,15 +65,33 @@ class Ghost:
             else:
                 self.target_x = player_x + (-5 if dx > 0 else 5)
                 self.target_y = player_y
-            self.target_x = min(max(0, self.target_x), len(game_map[0]) - 1)
-            self.target_y = min(max(0, self.target_y), len(game_map) - 1)
+            self.target_x, self.target_y = game_map.nearest_walkable(self.target_x, self.target_y)
+
+        # Random targets belong to a single ghost, so those keep planning with the pathfinder
+        if self.flow_fields is not None and self.personality != GhostPersonality.RANDOM:
+            # The shared field already holds the next step, so there is no path to cache
+            step = self.flow_fields.next_step((self.x, self.y), (self.target_x, self.target_y))
+            if step is None:
+                self.current_path = []
+                dx = max(min(self.target_x - self.x, 1), -1)
+                dy = max(min(self.target_y - self.y, 1), -1)
+                return dx, dy
+            self.current_path = [(self.x, self.y), step] if step != (self.x, self.y) else []
+            return step[0] - self.x, step[1] - self.y
 
         self.path_update_counter += 1
-        if self.path_update_counter >= 5 or not self.current_path:
+        goal = (self.target_x, self.target_y)
+        if self.current_path and self.current_path[-1] != goal:
+            # Planning for a target that moved is a new search, whatever the pathfinder
+            interval = PathFinder.REPLAN_INTERVAL
+        else:
+            interval = (self.pathfinder or PathFinder).REPLAN_INTERVAL
+        # A wall toggled onto the next step cannot wait for the interval
+        blocked = len(self.current_path) > 1 and not game_map.is_walkable(*self.current_path[1])
+        if self.path_update_counter >= interval or not self.current_path or blocked:
             self.path_update_counter = 0
-            pathfinder = PathFinder(game_map)
+            pathfinder = self.pathfinder or PathFinder(game_map)
             start = (self.x, self.y)
-            goal = (self.target_x, self.target_y)
             self.current_path = pathfinder.find_path(start, goal)
 
             if not self.current_path:
@@ -97,16 +111,7 @@ class Ghost:
         new_x = self.x + dx
         new_y = self.y + dy
 
-        if (0 <= new_x < len(game_map[0]) and
-                0 <= new_y < len(game_map) and
-                game_map[new_y][new_x] != 1):
-            next_cell = game_map[new_y][new_x]
-            if next_cell != 4:
-                self.current_cell = next_cell
-
-            game_map[self.y][self.x] = self.current_cell
-
+        if game_map.is_walkable(new_x, new_y):
+            game_map.occupancy.move(self, (self.x, self.y), (new_x, new_y))
             self.x = new_x
             self.y = new_y
-
-            game_map[self.y][self.x] = 4
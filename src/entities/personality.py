@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class GhostPersonality(Enum):
+    CHASER = 1
+    AMBUSHER = 2
+    RANDOM = 3
+    FLANKER = 4
@@ -1,16 +1,16 @@
+from src.game.constants import PLAYER_SPEED
+
+
 class Player:
-    def __init__(self, x, y):
+    def __init__(self, x, y, speed=PLAYER_SPEED):
         self.x = x
         self.y = y
+        self.speed = speed
         self.direction = (0, 0)
         self.next_direction = (0, 0)
 
     def can_move(self, dx, dy, game_map):
-        new_x = self.x + dx
-        new_y = self.y + dy
-        return (0 <= new_x < len(game_map[0]) and
-                0 <= new_y < len(game_map) and
-                game_map[new_y][new_x] != 1)
+        return game_map.is_walkable(self.x + dx, self.y + dy)
 
     def update(self, game_map):
         if self.next_direction != (0, 0) and self.can_move(*self.next_direction, game_map):
@@ -29,10 +29,7 @@ class Player:
         new_x = self.x + dx
         new_y = self.y + dy
 
-        if (0 <= new_x < len(game_map[0]) and
-                0 <= new_y < len(game_map) and
-                game_map[new_y][new_x] != 1):
-            game_map[self.y][self.x] = 0
+        if game_map.is_walkable(new_x, new_y):
+            game_map.occupancy.move(self, (self.x, self.y), (new_x, new_y))
             self.x = new_x
             self.y = new_y
-            game_map[self.y][self.x] = 3
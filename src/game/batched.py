@@ -0,0 +1,212 @@
+import numpy as np
+
+from src.entities.ghost import GhostPersonality
+from src.game.constants import PLAYER_SPEED, GHOST_SPEED
+from src.game.map import Map, find_player_start, find_ghost_starts
+from src.game.navigation import NavigationTable, DIRECTIONS, NO_STEP
+from src.game.scheduler import MoveTimer
+
+ACTION_NONE = -1
+ACTION_STOP = len(DIRECTIONS)
+
+# Lookup rows indexed by direction code; the extra last row is the "stop" / "no step" entry
+_DX = np.array([dx for dx, _ in DIRECTIONS] + [0], dtype=np.int32)
+_DY = np.array([dy for _, dy in DIRECTIONS] + [0], dtype=np.int32)
+
+
+class BatchedSimulation:
+    """N games of the same map stepped in lockstep with whole-array NumPy operations
+
+    Boards only hold terrain (0 empty, 1 wall, 2 dot); players and ghosts live in
+    coordinate arrays. Ghosts always take the shortest-path next step from a
+    NavigationTable shared by every game instead of caching their own paths.
+    """
+
+    def __init__(self, num_games, game_map=None, table=None, seed=None, cache=None):
+        grid = game_map if game_map is not None else Map().grid()
+        if cache is not None:
+            cache.attach(grid)
+            table = table or cache.navigation_table(grid)
+        player_pos = find_player_start(grid)
+        if not player_pos:
+            raise ValueError("No player start position found!")
+        ghost_positions = find_ghost_starts(grid)
+
+        self.num_games = num_games
+        self.height = grid.height
+        self.width = grid.width
+        self.table = table or NavigationTable(grid)
+        size = len(self.table.cells)
+        self.next_hops = np.frombuffer(self.table.next_hops, dtype=np.uint8).reshape(size, size)
+        self.cell_index = np.frombuffer(self.table.cell_index, dtype=np.int32)
+        # Ghost targets are snapped to reachable cells, like Ghost.calculate_move does
+        self.nearest_walkable = np.frombuffer(grid.walkable.table(), dtype=np.int32)
+        self.walkable_cells = np.frombuffer(grid.walkable.cells, dtype=np.int32)
+
+        walls = np.frombuffer(grid.walls, dtype=np.uint8).reshape(self.height, self.width)
+        dots = np.frombuffer(grid.dots.cell_bytes(), dtype=np.uint8).reshape(self.height, self.width)
+        self.initial_board = np.where(walls != 0, 1, dots * 2).astype(np.uint8)
+        self.initial_player = player_pos
+        self.initial_ghosts = np.array(ghost_positions, dtype=np.int32).reshape(-1, 2)
+
+        personalities = list(GhostPersonality)
+        self.personalities = np.array(
+            [personalities[i % len(personalities)].value for i in range(len(ghost_positions))], dtype=np.int32)
+        self.num_ghosts = len(ghost_positions)
+
+        n, g = num_games, self.num_ghosts
+        self.boards = np.empty((n, self.height, self.width), dtype=np.uint8)
+        self.player_x = np.empty(n, dtype=np.int32)
+        self.player_y = np.empty(n, dtype=np.int32)
+        self.direction = np.empty(n, dtype=np.int32)
+        self.next_direction = np.empty(n, dtype=np.int32)
+        self.ghost_x = np.empty((n, g), dtype=np.int32)
+        self.ghost_y = np.empty((n, g), dtype=np.int32)
+        self.target_x = np.empty((n, g), dtype=np.int32)
+        self.target_y = np.empty((n, g), dtype=np.int32)
+        self.dots_eaten = np.empty(n, dtype=np.int32)
+        self.ticks = np.empty(n, dtype=np.int64)
+        self.done = np.empty(n, dtype=bool)
+        # Every game steps in lockstep, so one timer per entity kind serves them all
+        self.player_timer = MoveTimer(PLAYER_SPEED)
+        self.ghost_timer = MoveTimer(GHOST_SPEED)
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self, games=None):
+        """Reset every game, or only the games selected by an index array or boolean mask"""
+        if games is None:
+            games = slice(None)
+        self.boards[games] = self.initial_board
+        self.player_x[games] = self.initial_player[0]
+        self.player_y[games] = self.initial_player[1]
+        self.direction[games] = ACTION_STOP
+        self.next_direction[games] = ACTION_STOP
+        self.ghost_x[games] = self.initial_ghosts[:, 0]
+        self.ghost_y[games] = self.initial_ghosts[:, 1]
+        self.target_x[games] = 0
+        self.target_y[games] = 0
+        self.dots_eaten[games] = 0
+        self.ticks[games] = 0
+        self.done[games] = False
+
+    def _walkable(self, games, x, y):
+        inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        cells = self.boards[games, np.clip(y, 0, self.height - 1), np.clip(x, 0, self.width - 1)]
+        return inside & (cells != 1)
+
+    def step(self, actions=None):
+        """Advance every running game by one tick
+
+        actions holds one direction code per game (an index into DIRECTIONS,
+        ACTION_STOP, or ACTION_NONE for no input). Returns boolean arrays of
+        the games that ate a dot and the games that died this tick.
+        """
+        alive = ~self.done
+        games = np.arange(self.num_games)
+        ate = np.zeros(self.num_games, dtype=bool)
+        died = np.zeros(self.num_games, dtype=bool)
+
+        if actions is not None:
+            actions = np.asarray(actions, dtype=np.int32)
+            pressed = alive & (actions != ACTION_NONE)
+            self.next_direction[pressed] = actions[pressed]
+        self.ticks[alive] += 1
+
+        start_x, start_y = self.player_x.copy(), self.player_y.copy()
+        if self.player_timer.advance():
+            ate = self._update_players(games, alive)
+            died = alive & self._caught()
+            self.done |= died
+            alive = ~self.done
+
+        if self.ghost_timer.advance():
+            ghost_x, ghost_y = self.ghost_x, self.ghost_y
+            self._update_ghosts(games, alive)
+            # A ghost and the player that swapped cells this tick passed through each other
+            swapped = ((ghost_x == self.player_x[:, None]) & (ghost_y == self.player_y[:, None]) &
+                       (self.ghost_x == start_x[:, None]) & (self.ghost_y == start_y[:, None])).any(axis=1)
+            caught = alive & (self._caught() | swapped)
+            died |= caught
+            self.done |= caught
+
+        return ate, died
+
+    def _caught(self):
+        return ((self.ghost_x == self.player_x[:, None]) &
+                (self.ghost_y == self.player_y[:, None])).any(axis=1)
+
+    def _update_players(self, games, alive):
+        turn = alive & (self.next_direction != ACTION_STOP) & self._walkable(
+            games,
+            self.player_x + _DX[self.next_direction],
+            self.player_y + _DY[self.next_direction])
+        self.direction[turn] = self.next_direction[turn]
+        self.next_direction[turn] = ACTION_STOP
+
+        dx, dy = _DX[self.direction], _DY[self.direction]
+        moving = alive & (self.direction != ACTION_STOP) & self._walkable(
+            games, self.player_x + dx, self.player_y + dy)
+        self.player_x += np.where(moving, dx, 0)
+        self.player_y += np.where(moving, dy, 0)
+
+        cells = self.boards[games, self.player_y, self.player_x]
+        ate = moving & (cells == 2)
+        self.boards[games[ate], self.player_y[ate], self.player_x[ate]] = 0
+        self.dots_eaten += ate
+        return ate
+
+    def _update_ghosts(self, games, alive):
+        px, py = self.player_x[:, None], self.player_y[:, None]
+        gx, gy = self.ghost_x, self.ghost_y
+        personality = self.personalities[None, :]
+        max_x, max_y = self.width - 1, self.height - 1
+
+        target_x = np.broadcast_to(px, gx.shape).copy()
+        target_y = np.broadcast_to(py, gy.shape).copy()
+
+        ambusher = personality == GhostPersonality.AMBUSHER.value
+        ambush_x = np.clip(px + np.where(px - gx > 0, 2, -2), 0, max_x)
+        ambush_y = np.clip(py + np.where(py - gy > 0, 2, -2), 0, max_y)
+        ambush = self.nearest_walkable[ambush_y * self.width + ambush_x]
+        target_x = np.where(ambusher, ambush % self.width, target_x)
+        target_y = np.where(ambusher, ambush // self.width, target_y)
+
+        flanker = personality == GhostPersonality.FLANKER.value
+        dx, dy = px - gx, py - gy
+        horizontal = np.abs(dx) > np.abs(dy)
+        flank_x = np.clip(np.where(horizontal, px, px + np.where(dx > 0, -5, 5)), 0, max_x)
+        flank_y = np.clip(np.where(horizontal, py + np.where(dy > 0, -5, 5), py), 0, max_y)
+        flank = self.nearest_walkable[flank_y * self.width + flank_x]
+        target_x = np.where(flanker, flank % self.width, target_x)
+        target_y = np.where(flanker, flank // self.width, target_y)
+
+        # RANDOM ghosts keep their target until they reach it, it proves unreachable,
+        # or a 10% coin flip picks a new one, mirroring Ghost.calculate_move
+        wanderer = np.broadcast_to(personality == GhostPersonality.RANDOM.value, gx.shape)
+        current = self.cell_index[gy * self.width + gx]
+        old_goal = self.cell_index[self.target_y * self.width + self.target_x]
+        retarget = wanderer & ((old_goal < 0) | (old_goal == current) |
+                               (self.rng.random(gx.shape) < 0.1))
+        target_x = np.where(wanderer, self.target_x, target_x)
+        target_y = np.where(wanderer, self.target_y, target_y)
+        picked = self.walkable_cells[self.rng.integers(0, len(self.walkable_cells), retarget.sum())]
+        target_x[retarget] = picked % self.width
+        target_y[retarget] = picked // self.width
+
+        goal = self.cell_index[target_y * self.width + target_x]
+        hop = self.next_hops[current, np.maximum(goal, 0)].astype(np.int32)
+        routed = (goal >= 0) & (hop != NO_STEP)
+        hop = np.where(routed, hop, ACTION_STOP)
+        step_x = np.where(routed, _DX[hop], np.clip(target_x - gx, -1, 1))
+        step_y = np.where(routed, _DY[hop], np.clip(target_y - gy, -1, 1))
+
+        new_x, new_y = gx + step_x, gy + step_y
+        inside = (new_x >= 0) & (new_x <= max_x) & (new_y >= 0) & (new_y <= max_y)
+        open_cell = self.boards[games[:, None], np.clip(new_y, 0, max_y), np.clip(new_x, 0, max_x)] != 1
+        moving = alive[:, None] & inside & open_cell
+
+        self.ghost_x = np.where(moving, new_x, gx)
+        self.ghost_y = np.where(moving, new_y, gy)
+        self.target_x = np.where(alive[:, None], target_x, self.target_x)
+        self.target_y = np.where(alive[:, None], target_y, self.target_y)
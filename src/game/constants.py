@@ -1,10 +1,14 @@
-from src.entities.ghost import GhostPersonality
+# The bare enum module, so that reading constants does not import the ghost AI and pathfinder
+from src.entities.personality import GhostPersonality
 
 CELL_SIZE = 20
-WINDOW_SIZE = (32 * CELL_SIZE, 32 * CELL_SIZE)
-FPS = 30
-PLAYER_SPEED = 5
-GHOST_SPEED = 7
+WINDOW_SIZE = (32 * CELL_SIZE, 32 * CELL_SIZE)  # largest window; bigger boards scroll
+FPS = 60  # render frame cap; the simulation runs at TICK_RATE regardless
+TICK_RATE = 30  # simulation ticks per second
+MAX_CATCHUP_TICKS = 5  # most ticks run for one late frame before the backlog is dropped
+PLAYER_SPEED = 6.0  # cells per second
+GHOST_SPEED = 30 / 7  # cells per second, one cell every 7 ticks
+DOT_SCORE = 10  # points per dot eaten
 BLACK = (0, 0, 0)
 BLUE = (0, 0, 255)
 WHITE = (255, 255, 255)
@@ -0,0 +1,146 @@
+from array import array
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+
+UNREACHED = 0x7FFFFFFF
+# A cached field is moved to a new target this many steps away instead of being rebuilt
+RETARGET_RADIUS = 4
+
+
+class FlowField:
+    """Distance from every walkable cell to one target, filled by a reverse BFS
+
+    Distances are stored relative to a bias so that moving the target can be
+    repaired in place: when the target moves k steps, every distance grows by at
+    most k, which is a single bias increment, and only the cells that end up
+    closer to the new target are rewritten by a BFS wave started there.
+    """
+
+    def __init__(self, game_map, target):
+        self.game_map = game_map
+        self.target = target
+        self.bias = 0
+        self.distances = array('i', [UNREACHED]) * (game_map.width * game_map.height)
+        self.last_used = 0
+        index = target[1] * game_map.width + target[0]
+        self.distances[index] = 0
+        self.expanded = self._flood(index)
+
+    def _flood(self, source):
+        """Lower the distances reachable from source and return how many cells were visited"""
+        walls = self.game_map.walls
+        width = self.game_map.width
+        size = len(self.distances)
+        distances = self.distances
+        queue = deque([source])
+        visited = 0
+        while queue:
+            i = queue.popleft()
+            visited += 1
+            step = distances[i] + 1
+            x = i % width
+            for j in (i - width if i >= width else -1,
+                      i + width if i + width < size else -1,
+                      i - 1 if x > 0 else -1,
+                      i + 1 if x + 1 < width else -1):
+                if j >= 0 and not walls[j] and distances[j] > step:
+                    distances[j] = step
+                    queue.append(j)
+        return visited
+
+    def distance(self, pos: Tuple[int, int]) -> Optional[int]:
+        value = self.distances[pos[1] * self.game_map.width + pos[0]]
+        return None if value == UNREACHED else value + self.bias
+
+    def retarget(self, target: Tuple[int, int]):
+        """Move the field to a target in the same region, rewriting only cells that got closer
+
+        Returns the number of cells the repair visited.
+        """
+        shift = self.distance(target)
+        if shift is None:
+            raise ValueError(f"{target} is not reachable from {self.target}")
+        self.bias += shift
+        index = target[1] * self.game_map.width + target[0]
+        self.distances[index] = -self.bias
+        self.target = target
+        visited = self._flood(index)
+        self.expanded += visited
+        return visited
+
+    def next_step(self, pos: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """Neighbour of pos that is one step closer to the target, pos itself at the target"""
+        if pos == self.target:
+            return pos
+        width = self.game_map.width
+        best = self.distances[pos[1] * width + pos[0]]
+        if best == UNREACHED:
+            return None
+        step = None
+        for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+            x, y = pos[0] + dx, pos[1] + dy
+            if self.game_map.is_walkable(x, y) and self.distances[y * width + x] < best:
+                best = self.distances[y * width + x]
+                step = (x, y)
+        return step
+
+
+class FlowFieldService:
+    """Flow fields shared by every ghost that heads for the same cell
+
+    At most one field per distinct target is computed, however many ghosts use
+    it, and up to max_fields are kept around for later ticks. A target that has
+    no field yet takes over a nearby field nobody used this tick, so following
+    the player as it moves costs a partial repair instead of a full BFS.
+    """
+
+    def __init__(self, game_map, max_fields=32):
+        self.game_map = game_map
+        self.max_fields = max_fields
+        self.fields = OrderedDict()
+        self.tick = 0
+        # Running totals read by the frame profiler
+        self.calls = 0
+        self.expanded = 0
+
+    def begin_tick(self):
+        self.tick += 1
+
+    def field(self, target: Tuple[int, int]) -> Optional[FlowField]:
+        if not self.game_map.is_walkable(*target):
+            return None
+
+        field = self.fields.get(target)
+        if field is None:
+            for old_target, candidate in self.fields.items():
+                if candidate.last_used < self.tick:
+                    shift = candidate.distance(target)
+                    if shift is not None and shift <= RETARGET_RADIUS:
+                        field = self.fields.pop(old_target)
+                        self.expanded += field.retarget(target)
+                        break
+            if field is None:
+                field = FlowField(self.game_map, target)
+                self.expanded += field.expanded
+            self.fields[target] = field
+            if len(self.fields) > self.max_fields:
+                self.fields.popitem(last=False)
+
+        self.fields.move_to_end(target)
+        field.last_used = self.tick
+        return field
+
+    def next_step(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        self.calls += 1
+        field = self.field(goal)
+        return field.next_step(start) if field is not None else None
+
+    def find_path(self, start: Tuple[int, int], goal: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Full path by walking the field downhill, so the service can back a PathFinder"""
+        field = self.field(goal)
+        if field is None or field.distance(start) is None:
+            return []
+        path = [start]
+        while path[-1] != goal:
+            path.append(field.next_step(path[-1]))
+        return path
@@ -1,126 +1,144 @@
 import sys
+from collections import deque
 
 import pygame
 
-from src.entities.ghost import Ghost, GhostPersonality
-from src.entities.player import Player
-from src.game.constants import CELL_SIZE, FPS, PLAYER_SPEED, GHOST_SPEED, BLACK, BLUE, WHITE, YELLOW, GHOST_COLORS
-from src.game.map import Map
-from src.game.utils import find_player_start, find_ghost_starts
-from src.ui.screens import LossScreen
+from src.game.constants import FPS, TICK_RATE
+from src.game.navcache import default_cache
+from src.game.profiler import FrameProfiler
+from src.game.replay import Recorder
+from src.game.scheduler import FixedTimestep
+from src.game.simulation import Simulation
+from src.ui.overlay import ProfilerOverlay
+from src.ui.renderer import MapRenderer
+from src.ui.screens import LossScreen, LevelCompleteScreen
 
 
 class Game:
-    def __init__(self, screen, clock):
+    def __init__(self, screen, clock, game_map=None, record_path=None, trace_path=None, spectators=None):
         self.screen = screen
         self.clock = clock
-
-    def draw_map(self, game_map, ghosts):
-        ghost_positions = {(ghost.x, ghost.y): ghost.personality for ghost in ghosts}
-
-        for y in range(len(game_map)):
-            for x in range(len(game_map[y])):
-                cell = game_map[y][x]
-                rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-
-                if cell == 1:  # Wall
-                    pygame.draw.rect(self.screen, BLUE, rect)
-                elif cell == 2:  # Dot
-                    pygame.draw.rect(self.screen, BLACK, rect)
-                    pygame.draw.circle(self.screen, WHITE,
-                                       (x * CELL_SIZE + CELL_SIZE // 2,
-                                        y * CELL_SIZE + CELL_SIZE // 2),
-                                       CELL_SIZE // 6)
-                elif cell == 3:  # Player
-                    pygame.draw.rect(self.screen, BLACK, rect)
-                    pygame.draw.circle(self.screen, YELLOW,
-                                       (x * CELL_SIZE + CELL_SIZE // 2,
-                                        y * CELL_SIZE + CELL_SIZE // 2),
-                                       CELL_SIZE // 2)
-                elif cell == 4:  # Ghost
-                    pygame.draw.rect(self.screen, BLACK, rect)
-                    ghost_color = GHOST_COLORS[ghost_positions[(x, y)]]
-                    pygame.draw.circle(self.screen, ghost_color,
-                                       (x * CELL_SIZE + CELL_SIZE // 2,
-                                        y * CELL_SIZE + CELL_SIZE // 2),
-                                       CELL_SIZE // 2)
-                else:  # Empty space
-                    pygame.draw.rect(self.screen, BLACK, rect)
+        self.game_map = game_map
+        self.record_path = record_path
+        # SpectatorServer running in its own thread that every tick is streamed to, if any
+        self.spectators = spectators
+        # Profiling runs from the start when a trace is wanted, otherwise F3 toggles it
+        self.trace_path = trace_path
+        self.profiler = FrameProfiler()
+        self.profiler.enabled = trace_path is not None
 
     def run(self):
-        generator = Map()
-        game_map = generator.predefined
-
-        player_pos = find_player_start(game_map)
-        if player_pos:
-            player = Player(player_pos[0], player_pos[1])
-        else:
-            print("No player start position found!")
+        profiler = self.profiler
+        # Retries and later runs map the navigation structures instead of building them again
+        simulation = Simulation(self.game_map, profiler=profiler, cache=default_cache())
+        # Every game is recorded; it is only written out when a record path was given
+        recorder = Recorder(simulation, checkpoint_interval=10 * TICK_RATE)
+        try:
+            recorder.reset()
+        except ValueError as error:
+            print(error)
             return
-
-        ghost_positions = find_ghost_starts(game_map)
-        ghosts = []
-        personalities = list(GhostPersonality)
-        for i, pos in enumerate(ghost_positions):
-            personality = personalities[i % len(personalities)]
-            ghosts.append(Ghost(pos[0], pos[1], personality))
-
+        if self.spectators is not None:
+            self.spectators.publish(simulation)
+        renderer = MapRenderer(self.screen, simulation.game_map)
+        # Composed now so that the end of a game shows its screen without any font or text work
+        loss_screen = LossScreen(self.screen)
+        loss_screen.prepare()
+        complete_screen = LevelCompleteScreen(self.screen)
+        complete_screen.prepare()
+        score = None
+        overlay = ProfilerOverlay(profiler)
+        show_overlay = False
+        scheduler = FixedTimestep()
+
+        # Key presses are handed out one per tick, so a quick turn is not lost in a catch-up; only the last
+        # two are kept, so slow frames or key repeat cannot build up a backlog that lags behind the keyboard
+        actions = deque(maxlen=2)
         running = True
-        player_move_counter = 0
-        ghost_move_counter = 0
         while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
+            profiler.begin_frame()
+            with profiler.phase('events'):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
                         running = False
-                    elif event.key == pygame.K_LEFT:
-                        player.set_next_direction(-1, 0)
-                    elif event.key == pygame.K_RIGHT:
-                        player.set_next_direction(1, 0)
-                    elif event.key == pygame.K_UP:
-                        player.set_next_direction(0, -1)
-                    elif event.key == pygame.K_DOWN:
-                        player.set_next_direction(0, 1)
-                    elif event.key == pygame.K_SPACE:  # Stop movement
-                        player.set_next_direction(0, 0)
-
-            player_move_counter += 1
-            if player_move_counter >= PLAYER_SPEED:
-                player_move_counter = 0
-                player.update(game_map)
-
-            ghost_move_counter += 1
-            if ghost_move_counter >= GHOST_SPEED:
-                ghost_move_counter = 0
-                for ghost in ghosts:
-                    dx, dy = ghost.calculate_move(player.x, player.y, game_map)
-                    ghost.move(dx, dy, game_map)
-
-                    if ghost.x == player.x and ghost.y == player.y:
-                        loss_screen = LossScreen(self.screen)
-                        while True:
-                            loss_screen.draw()
-                            pygame.display.flip()
-
-                            for event in pygame.event.get():
-                                if event.type == pygame.QUIT:
-                                    pygame.quit()
-                                    sys.exit()
-
-                                choice = loss_screen.handle_input(event)
-                                if choice == 'Try Again':
-                                    return 'retry'
-                                elif choice == 'Main Menu':
-                                    return 'menu'
-
-                            self.clock.tick(FPS)
-
-            self.screen.fill(BLACK)
-            self.draw_map(game_map, ghosts)
-            pygame.display.flip()
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_ESCAPE:
+                            running = False
+                        elif event.key == pygame.K_F3:
+                            show_overlay = not show_overlay
+                            profiler.enabled = show_overlay or self.trace_path is not None
+                        elif event.key == pygame.K_LEFT:
+                            actions.append((-1, 0))
+                        elif event.key == pygame.K_RIGHT:
+                            actions.append((1, 0))
+                        elif event.key == pygame.K_UP:
+                            actions.append((0, -1))
+                        elif event.key == pygame.K_DOWN:
+                            actions.append((0, 1))
+                        elif event.key == pygame.K_SPACE:  # Stop movement
+                            actions.append((0, 0))
+                        elif event.key == pygame.K_m:
+                            renderer.toggle_minimap()
+
+            # A late frame runs several ticks, so game speed does not depend on the frame rate
+            with profiler.phase('simulation'):
+                for _ in range(scheduler.advance()):
+                    _, events = recorder.step(actions.popleft() if actions else None)
+                    if self.spectators is not None:
+                        self.spectators.publish(simulation, events)
+                    if simulation.done:
+                        break
+
+            if simulation.score != score:
+                score = simulation.score
+                pygame.display.set_caption(f"Pacman - {score}")
+
+            if simulation.done:
+                self.save_recording(recorder)
+                self.save_trace()
+                end_screen = complete_screen if simulation.level_complete else loss_screen
+                while True:
+                    end_screen.draw()
+                    pygame.display.flip()
+
+                    for event in pygame.event.get():
+                        if event.type == pygame.QUIT:
+                            pygame.quit()
+                            sys.exit()
+
+                        choice = end_screen.handle_input(event)
+                        if choice in ('Try Again', 'Play Again'):
+                            return 'retry'
+                        elif choice == 'Main Menu':
+                            return 'menu'
+
+                    self.clock.tick(FPS)
+
+            with profiler.phase('draw'):
+                dirty_rects = renderer.draw(simulation.game_map, simulation.positions(scheduler.alpha))
+            if show_overlay or overlay.surface is not None:
+                with profiler.phase('overlay'):
+                    if show_overlay:
+                        rect = overlay.draw(self.screen)
+                        dirty_rects.append(rect)
+                        renderer.damage(rect)
+                    else:
+                        # The cells under the panel were repainted by this draw, drop the cached panel
+                        overlay.surface = None
+            with profiler.phase('display'):
+                pygame.display.update(dirty_rects)
+            profiler.end_frame()
             self.clock.tick(FPS)
 
+        self.save_recording(recorder)
+        self.save_trace()
         pygame.quit()
         sys.exit()
+
+    def save_recording(self, recorder):
+        if self.record_path:
+            recorder.recording.save(self.record_path)
+
+    def save_trace(self):
+        if self.trace_path:
+            self.profiler.export_trace(self.trace_path)
@@ -0,0 +1,101 @@
+"""Seeded procedural maze generator
+
+    python -m src.game.generator maps/large.pmap --size 512 --ghosts 64 --seed 7
+"""
+import argparse
+import random
+
+from src.game.grid import Grid
+
+MIN_SIZE = 8
+MAX_SIZE = 2048
+
+
+def generate_maze(width, height, ghosts=4, seed=None, braid=0.75):
+    """Generate a Pac-Man style maze of width x height cells
+
+    Corridors are carved on the odd-coordinate lattice with an iterative
+    randomized depth-first search, which gives one long connected maze. A
+    braid fraction of the resulting dead ends is then opened into a
+    neighbouring corridor so ghosts and the player get loops to run around.
+    The player starts on the walkable cell closest to the centre and ghosts
+    spawn on random walkable cells away from it.
+    """
+    if not (MIN_SIZE <= width <= MAX_SIZE and MIN_SIZE <= height <= MAX_SIZE):
+        raise ValueError(f"Maze size must be between {MIN_SIZE} and {MAX_SIZE}, got {width}x{height}")
+    rng = random.Random(seed)
+    walls = bytearray(b'\x01') * (width * height)
+
+    # Lattice cells sit on odd coordinates, strictly inside the border wall
+    cols, rows = (width - 1) // 2, (height - 1) // 2
+    steps = ((1, 0), (-1, 0), (0, 1), (0, -1))
+    visited = bytearray(cols * rows)
+
+    def carve(x, y):
+        walls[y * width + x] = 0
+
+    start = rng.randrange(cols * rows)
+    visited[start] = 1
+    carve(2 * (start % cols) + 1, 2 * (start // cols) + 1)
+    stack = [start]
+    while stack:
+        cell = stack[-1]
+        cx, cy = cell % cols, cell // cols
+        options = [(cx + dx, cy + dy) for dx, dy in steps
+                   if 0 <= cx + dx < cols and 0 <= cy + dy < rows and not visited[(cy + dy) * cols + cx + dx]]
+        if not options:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(options)
+        visited[ny * cols + nx] = 1
+        carve(cx + nx + 1, cy + ny + 1)  # the wall between both lattice cells
+        carve(2 * nx + 1, 2 * ny + 1)
+        stack.append(ny * cols + nx)
+
+    for cy in range(rows):
+        for cx in range(cols):
+            x, y = 2 * cx + 1, 2 * cy + 1
+            exits = sum(not walls[(y + dy) * width + x + dx] for dx, dy in steps)
+            if exits != 1 or rng.random() >= braid:
+                continue
+            closed = [(dx, dy) for dx, dy in steps
+                      if 0 <= cx + dx < cols and 0 <= cy + dy < rows and walls[(y + dy) * width + x + dx]]
+            if closed:
+                dx, dy = rng.choice(closed)
+                carve(x + dx, y + dy)
+
+    walkable = [i for i in range(width * height) if not walls[i]]
+    centre_x, centre_y = width // 2, height // 2
+    player = min(walkable, key=lambda i: abs(i % width - centre_x) + abs(i // width - centre_y))
+    player_start = (player % width, player // width)
+
+    min_distance = (width + height) // 4
+    far = [i for i in walkable
+           if abs(i % width - player_start[0]) + abs(i // width - player_start[1]) >= min_distance]
+    candidates = far if len(far) >= ghosts else [i for i in walkable if i != player]
+    ghost_starts = [(i % width, i // width) for i in rng.sample(candidates, min(ghosts, len(candidates)))]
+
+    dots = bytearray(1 - wall for wall in walls)
+    dots[player] = 0
+    return Grid(width, height, walls, dots, player_start, ghost_starts)
+
+
+def main(argv=None):
+    from src.game.map import save_map
+
+    parser = argparse.ArgumentParser(description="Generate a maze and write it in the binary map format")
+    parser.add_argument('output')
+    parser.add_argument('--size', type=int, default=64, help="width and height in cells")
+    parser.add_argument('--width', type=int, help="overrides --size")
+    parser.add_argument('--height', type=int, help="overrides --size")
+    parser.add_argument('--ghosts', type=int, default=4)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--braid', type=float, default=0.75, help="fraction of dead ends opened into loops")
+    args = parser.parse_args(argv)
+
+    grid = generate_maze(args.width or args.size, args.height or args.size, args.ghosts, args.seed, args.braid)
+    save_map(grid, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+from array import array
+from typing import Iterator, Optional, Tuple
+
+WALL = 1
+DOT = 2
+PLAYER_START = 3
+GHOST_START = 4
+
+# Side of the square blocks whose remaining dots are counted for DotLayer.nearest
+DOT_BLOCK = 8
+
+
+class Occupancy:
+    """Index from cell to the entities standing on it, kept separate from the terrain"""
+
+    def __init__(self):
+        self.cells = {}
+        self.moved_from = {}
+
+    def add(self, entity):
+        self.cells.setdefault((entity.x, entity.y), []).append(entity)
+
+    def remove(self, entity):
+        cell = (entity.x, entity.y)
+        entities = self.cells[cell]
+        entities.remove(entity)
+        if not entities:
+            del self.cells[cell]
+
+    def move(self, entity, old, new):
+        entities = self.cells[old]
+        entities.remove(entity)
+        if not entities:
+            del self.cells[old]
+        self.cells.setdefault(new, []).append(entity)
+        self.moved_from.setdefault(entity, old)
+
+    def at(self, x, y):
+        return self.cells.get((x, y), ())
+
+    def begin_tick(self):
+        """Forget the moves of the previous tick so swap detection only spans one tick"""
+        self.moved_from.clear()
+
+    def collides(self, a, b):
+        """True if a and b share a cell or swapped cells with each other during this tick"""
+        if a.x == b.x and a.y == b.y:
+            return True
+        return (self.moved_from.get(a) == (b.x, b.y) and
+                self.moved_from.get(b) == (a.x, a.y))
+
+
+def _ring(x, y, radius):
+    """Cells on the square ring at Chebyshev distance radius around (x, y)"""
+    if radius == 0:
+        yield x, y
+        return
+    for rx in range(x - radius, x + radius + 1):
+        yield rx, y - radius
+        yield rx, y + radius
+    for ry in range(y - radius + 1, y + radius):
+        yield x - radius, ry
+        yield x + radius, ry
+
+
+class DotLayer:
+    """Remaining dots as one bit per walkable cell, with the counts kept up to date on every eat
+
+    cell_index maps a row-major cell to its bit (-1 for walls) and cells maps a
+    bit back to its cell; both depend only on the walls and are shared by copies.
+    The remaining count and a count per DOT_BLOCK x DOT_BLOCK block change with
+    each eaten dot, so the remaining count is O(1) and nearest() only looks
+    inside blocks that still hold dots. Eaten cells are appended to changes,
+    which renderers catch up with like Grid.wall_changes.
+    """
+
+    def __init__(self, width, height, cell_index, cells, bits, block_counts, remaining):
+        self.width = width
+        self.height = height
+        self.cell_index = cell_index
+        self.cells = cells
+        self.bits = bits
+        self.block_counts = block_counts
+        self.blocks_wide = (width + DOT_BLOCK - 1) // DOT_BLOCK
+        self.remaining = remaining
+        self.changes = []
+
+    @classmethod
+    def from_cells(cls, width, height, walls, dots):
+        """Build the layer from row-major wall and dot bytes, one byte per cell"""
+        cell_index = array('i', [-1]) * (width * height)
+        cells = array('i')
+        for i, wall in enumerate(walls):
+            if not wall:
+                cell_index[i] = len(cells)
+                cells.append(i)
+        blocks_wide = (width + DOT_BLOCK - 1) // DOT_BLOCK
+        blocks_high = (height + DOT_BLOCK - 1) // DOT_BLOCK
+        layer = cls(width, height, cell_index, cells, bytearray((len(cells) + 7) // 8),
+                    array('i', [0]) * (blocks_wide * blocks_high), 0)
+        for bit, i in enumerate(cells):
+            if dots[i]:
+                layer.bits[bit >> 3] |= 1 << (bit & 7)
+        layer._recount()
+        return layer
+
+    def _recount(self):
+        for block in range(len(self.block_counts)):
+            self.block_counts[block] = 0
+        self.remaining = 0
+        for bit, i in enumerate(self.cells):
+            if self.bits[bit >> 3] >> (bit & 7) & 1:
+                self.block_counts[self._block(i % self.width, i // self.width)] += 1
+                self.remaining += 1
+
+    def _block(self, x, y):
+        return (y // DOT_BLOCK) * self.blocks_wide + x // DOT_BLOCK
+
+    def copy(self):
+        return DotLayer(self.width, self.height, self.cell_index, self.cells, bytearray(self.bits),
+                        array('i', self.block_counts), self.remaining)
+
+    def has(self, x, y):
+        bit = self.cell_index[y * self.width + x]
+        return bit >= 0 and self.bits[bit >> 3] >> (bit & 7) & 1 == 1
+
+    def eat(self, x, y):
+        """Remove the dot at (x, y) and return whether there was one"""
+        bit = self.cell_index[y * self.width + x]
+        if bit < 0 or not self.bits[bit >> 3] >> (bit & 7) & 1:
+            return False
+        self.bits[bit >> 3] &= ~(1 << (bit & 7))
+        self.block_counts[self._block(x, y)] -= 1
+        self.remaining -= 1
+        self.changes.append((x, y))
+        return True
+
+    def positions(self) -> Iterator[Tuple[int, int]]:
+        """Cells of the remaining dots in row-major order, skipping eaten bytes eight bits at a time"""
+        for byte_index, byte in enumerate(self.bits):
+            if byte:
+                for offset in range(8):
+                    if byte >> offset & 1:
+                        i = self.cells[byte_index * 8 + offset]
+                        yield i % self.width, i // self.width
+
+    def nearest(self, x, y) -> Optional[Tuple[int, int]]:
+        """Remaining dot closest to (x, y) in Manhattan distance, ignoring walls, or None
+
+        Blocks are visited in rings around the block of (x, y) and the search
+        stops once no block of the next ring can be closer than the best dot
+        found, so the cost depends on the distance to the dot, not the board.
+        """
+        if not self.remaining:
+            return None
+        block_x, block_y = x // DOT_BLOCK, y // DOT_BLOCK
+        blocks_high = len(self.block_counts) // self.blocks_wide
+        best, best_distance = None, None
+        for ring in range(max(self.blocks_wide, blocks_high)):
+            # A block ring blocks away is at least this far along one axis
+            if best is not None and (ring - 1) * DOT_BLOCK + 1 > best_distance:
+                break
+            for cx, cy in _ring(block_x, block_y, ring):
+                if not (0 <= cx < self.blocks_wide and 0 <= cy < blocks_high):
+                    continue
+                if not self.block_counts[cy * self.blocks_wide + cx]:
+                    continue
+                for dot_y in range(cy * DOT_BLOCK, min(cy * DOT_BLOCK + DOT_BLOCK, self.height)):
+                    for dot_x in range(cx * DOT_BLOCK, min(cx * DOT_BLOCK + DOT_BLOCK, self.width)):
+                        if self.has(dot_x, dot_y):
+                            distance = abs(dot_x - x) + abs(dot_y - y)
+                            if best is None or distance < best_distance:
+                                best, best_distance = (dot_x, dot_y), distance
+        return best
+
+    def cell_bytes(self) -> bytearray:
+        """The dots as one row-major byte per cell, the layout of the map format and NumPy boards"""
+        cells = bytearray(self.width * self.height)
+        for x, y in self.positions():
+            cells[y * self.width + x] = 1
+        return cells
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.bits)
+
+    def load_bytes(self, data):
+        """Replace the remaining dots with bits from to_bytes() of a layer on the same walls"""
+        self.bits[:] = data
+        self._recount()
+
+
+class WalkableIndex:
+    """Walkable cells reachable from the player start, and the nearest of them to every cell
+
+    cells lists the reachable cells as row-major indices, for sampling a random
+    target. The cell-to-nearest table is filled on first use by one breadth-first
+    flood outwards from all reachable cells at once, walls included, so a target
+    on a wall or in a sealed-off pocket snaps to the closest cell a ghost can
+    actually get to.
+    """
+
+    def __init__(self, width, height, walls, start=None):
+        self.width = width
+        self.height = height
+        self.cells = array('i')
+        if start is not None:
+            seen = bytearray(walls)  # Walls count as seen, so the flood stays on walkable cells
+            first = start[1] * width + start[0]
+            seen[first] = 1
+            self.cells.append(first)
+            for i in self.cells:  # Grows while it is walked, a breadth-first queue
+                x, y = i % width, i // width
+                for n, inside in ((i - 1, x > 0), (i + 1, x < width - 1), (i - width, y > 0),
+                                  (i + width, y < height - 1)):
+                    if inside and not seen[n]:
+                        seen[n] = 1
+                        self.cells.append(n)
+        else:
+            self.cells.extend(i for i, wall in enumerate(walls) if not wall)
+        self._nearest = None
+
+    @classmethod
+    def from_buffers(cls, width, height, cells, nearest) -> 'WalkableIndex':
+        """Index over the arrays returned by buffers(), which may be read-only views of a mapped file"""
+        index = cls(width, height, b'')
+        index.cells = cells
+        index._nearest = nearest
+        return index
+
+    def buffers(self):
+        """The reachable cells and the nearest table, built first if needed"""
+        return self.cells, self.table()
+
+    def _build_nearest(self):
+        width, height = self.width, self.height
+        nearest = array('i', [-1]) * (width * height)
+        queue = array('i', self.cells)
+        for i in self.cells:
+            nearest[i] = i
+        for i in queue:
+            x, y = i % width, i // width
+            for n, inside in ((i - 1, x > 0), (i + 1, x < width - 1), (i - width, y > 0),
+                              (i + width, y < height - 1)):
+                if inside and nearest[n] < 0:
+                    nearest[n] = nearest[i]
+                    queue.append(n)
+        self._nearest = nearest
+
+    def table(self) -> array:
+        """Row-major index of the nearest reachable cell for every row-major cell, for whole-array lookups"""
+        if self._nearest is None:
+            self._build_nearest()
+        return self._nearest
+
+    def nearest(self, x, y) -> Tuple[int, int]:
+        """Reachable cell closest to (x, y), which is clamped to the map first"""
+        if not self.cells:
+            return x, y
+        x = min(max(x, 0), self.width - 1)
+        y = min(max(y, 0), self.height - 1)
+        i = self.table()[y * self.width + x]
+        return i % self.width, i // self.width
+
+    def random(self, rng) -> Tuple[int, int]:
+        """Uniformly random reachable cell"""
+        i = self.cells[rng.randrange(len(self.cells))]
+        return i % self.width, i // self.width
+
+
+class Grid:
+    """Game map with an immutable wall layer, a mutable dot layer and an entity occupancy index
+
+    The walls are a flat row-major byte buffer, so they can be wrapped by NumPy
+    without copying: numpy.frombuffer(grid.walls, numpy.uint8).reshape(grid.height, grid.width).
+    The dots are a DotLayer; dots.cell_bytes() gives them in the same layout.
+
+    Walls are shared with the grid this one was copied from until set_wall()
+    toggles one, which gives the grid its own copy. Every toggled cell is
+    appended to wall_changes, so planners and renderers holding on to the
+    grid catch up with wall_changes[seen:] instead of rescanning the walls.
+    """
+
+    def __init__(self, width, height, walls, dots, player_start=None, ghost_starts=(), walkable=None):
+        """dots is a DotLayer for these walls or row-major bytes, one per cell"""
+        self.width = width
+        self.height = height
+        self.walls = bytes(walls)
+        if not isinstance(dots, DotLayer):
+            dots = DotLayer.from_cells(width, height, self.walls, dots)
+        self.dots = dots
+        self.player_start = player_start
+        self.ghost_starts = list(ghost_starts)
+        self.occupancy = Occupancy()
+        self.wall_changes = []
+        self._walkable = walkable
+
+    @property
+    def walkable(self):
+        """WalkableIndex of the walls, built on first use and shared with every copy"""
+        if self._walkable is None:
+            self._walkable = WalkableIndex(self.width, self.height, self.walls, self.player_start)
+        return self._walkable
+
+    @walkable.setter
+    def walkable(self, index):
+        self._walkable = index
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a grid from a list-of-lists map such as Map.predefined
+
+        The player and ghost starts are indexed in the same single pass. Ghost
+        spawn cells start with a dot under the ghost, the player start does not.
+        """
+        walls = bytearray()
+        dots = bytearray()
+        player_start = None
+        ghost_starts = []
+        for y, row in enumerate(rows):
+            for x, cell in enumerate(row):
+                walls.append(cell == WALL)
+                dots.append(cell == DOT or cell == GHOST_START)
+                if cell == PLAYER_START and player_start is None:
+                    player_start = (x, y)
+                elif cell == GHOST_START:
+                    ghost_starts.append((x, y))
+        return cls(len(rows[0]), len(rows), walls, dots, player_start, ghost_starts)
+
+    def copy(self):
+        """Fresh grid for a new game: shares the walls until set_wall(), copies the dots, no entities"""
+        return Grid(self.width, self.height, bytes(self.walls), self.dots.copy(), self.player_start,
+                    self.ghost_starts, self.walkable)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_walkable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and not self.walls[y * self.width + x]
+
+    def is_wall(self, x, y):
+        return self.walls[y * self.width + x] == WALL
+
+    def set_wall(self, x, y, wall):
+        """Open or close the cell at (x, y); returns whether it changed
+
+        A dot under a new wall is removed, so the level can still be completed.
+        """
+        index = y * self.width + x
+        if bool(self.walls[index]) == bool(wall):
+            return False
+        if not isinstance(self.walls, bytearray):
+            self.walls = bytearray(self.walls)
+        self.walls[index] = WALL if wall else 0
+        if wall:
+            self.dots.eat(x, y)
+        self.wall_changes.append((x, y))
+        return True
+
+    def nearest_walkable(self, x, y):
+        """Reachable cell closest to (x, y), also when walls were toggled since the index was built"""
+        x, y = self.walkable.nearest(x, y)
+        if self.wall_changes and not self.is_walkable(x, y):
+            # Closed by set_wall; doors are small, so the next open cell is a few rings out
+            for radius in range(1, max(self.width, self.height)):
+                for cx, cy in _ring(x, y, radius):
+                    if self.is_walkable(cx, cy):
+                        return cx, cy
+        return x, y
+
+    def random_walkable(self, rng):
+        """Uniformly random reachable cell, skipping cells closed since the index was built"""
+        x, y = self.walkable.random(rng)
+        if not self.wall_changes:
+            return x, y
+        for _ in range(64):
+            if self.is_walkable(x, y):
+                return x, y
+            x, y = self.walkable.random(rng)
+        return self.nearest_walkable(x, y)
+
+    def has_dot(self, x, y):
+        return self.dots.has(x, y)
+
+    def eat_dot(self, x, y):
+        """Remove the dot at (x, y) and return whether there was one"""
+        return self.dots.eat(x, y)
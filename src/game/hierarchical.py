@@ -0,0 +1,273 @@
+from array import array
+from collections import deque
+from heapq import heappush, heappop
+from typing import Dict, List, Optional, Tuple
+
+from src.game.navigation import DIRECTIONS
+
+# Border openings at least this wide get a transition at each end instead of one in the middle
+WIDE_ENTRANCE = 6
+
+
+class HierarchicalPathFinder:
+    """HPA*-style pathfinding over square sectors of the grid
+
+    The grid is cut into cluster_size x cluster_size sectors. Every run of open
+    cells along a border between two sectors becomes one or two transitions,
+    and the path lengths between the transitions of each sector are precomputed
+    with searches confined to that sector. A query links start and goal to the
+    transitions of their own sectors, runs A* on this small abstract graph and
+    then refines only the first refine_steps cells into a concrete path, which
+    is all a ghost walks before it replans. Memory grows with the number of
+    transitions, not with the square of the walkable cells.
+    """
+
+    def __init__(self, game_map, cluster_size=16, refine_steps=8):
+        self.game_map = game_map
+        self.cluster_size = cluster_size
+        self.refine_steps = refine_steps
+        self.expanded = 0
+        self.nodes: List[Tuple[int, int]] = []
+        self.node_at: Dict[Tuple[int, int], int] = {}
+        self.edges: List[List[Tuple[int, int]]] = []
+        self.cluster_nodes: Dict[Tuple[int, int], List[int]] = {}
+        self.components = array('i', [-1]) * (game_map.width * game_map.height)
+        self._label_components()
+        self._build_entrances()
+        self._build_intra_edges()
+
+    @classmethod
+    def from_buffers(cls, game_map, cluster_size, refine_steps, components, nodes, edge_offsets, edge_targets,
+                     edge_costs) -> 'HierarchicalPathFinder':
+        """Planner over the arrays returned by buffers(), without labelling or searching any sector"""
+        planner = cls.__new__(cls)
+        planner.game_map = game_map
+        planner.cluster_size = cluster_size
+        planner.refine_steps = refine_steps
+        planner.expanded = 0
+        planner.nodes = []
+        planner.node_at = {}
+        planner.edges = []
+        planner.cluster_nodes = {}
+        planner.components = components
+        for i in range(len(nodes) // 2):
+            planner._node((nodes[2 * i], nodes[2 * i + 1]))
+        for node, edges in enumerate(planner.edges):
+            for slot in range(edge_offsets[node], edge_offsets[node + 1]):
+                edges.append((edge_targets[slot], edge_costs[slot]))
+        return planner
+
+    def buffers(self):
+        """Components, transition cells and the abstract graph as flat arrays, see from_buffers"""
+        nodes = array('H')
+        for x, y in self.nodes:
+            nodes.extend((x, y))
+        edge_offsets, edge_targets, edge_costs = array('I', [0]), array('I'), array('I')
+        for edges in self.edges:
+            for other, cost in edges:
+                edge_targets.append(other)
+                edge_costs.append(cost)
+            edge_offsets.append(len(edge_targets))
+        return self.components, nodes, edge_offsets, edge_targets, edge_costs
+
+    def _label_components(self):
+        """Flood-fill connected regions so unreachable goals are rejected without searching"""
+        grid = self.game_map
+        width = grid.width
+        label = 0
+        for i, wall in enumerate(grid.walls):
+            if wall or self.components[i] >= 0:
+                continue
+            self.components[i] = label
+            queue = deque([(i % width, i // width)])
+            while queue:
+                x, y = queue.popleft()
+                for dx, dy in DIRECTIONS:
+                    nx, ny = x + dx, y + dy
+                    if grid.is_walkable(nx, ny) and self.components[ny * width + nx] < 0:
+                        self.components[ny * width + nx] = label
+                        queue.append((nx, ny))
+            label += 1
+
+    def cluster_of(self, pos: Tuple[int, int]) -> Tuple[int, int]:
+        return pos[0] // self.cluster_size, pos[1] // self.cluster_size
+
+    def _bounds(self, cluster):
+        size = self.cluster_size
+        x0, y0 = cluster[0] * size, cluster[1] * size
+        return x0, y0, min(x0 + size, self.game_map.width), min(y0 + size, self.game_map.height)
+
+    def _node(self, pos):
+        node = self.node_at.get(pos)
+        if node is None:
+            node = len(self.nodes)
+            self.nodes.append(pos)
+            self.edges.append([])
+            self.node_at[pos] = node
+            self.cluster_nodes.setdefault(self.cluster_of(pos), []).append(node)
+        return node
+
+    def _add_entrance(self, run):
+        picks = [run[0], run[-1]] if len(run) >= WIDE_ENTRANCE else [run[len(run) // 2]]
+        for a, b in picks:
+            first, second = self._node(a), self._node(b)
+            self.edges[first].append((second, 1))
+            self.edges[second].append((first, 1))
+
+    def _build_entrances(self):
+        grid = self.game_map
+        size = self.cluster_size
+        for border in range(size, grid.width, size):
+            self._scan_border([((border - 1, y), (border, y)) for y in range(grid.height)])
+        for border in range(size, grid.height, size):
+            self._scan_border([((x, border - 1), (x, border)) for x in range(grid.width)])
+
+    def _scan_border(self, pairs):
+        grid = self.game_map
+        run = []
+        for a, b in pairs:
+            # Runs end at walls and at sector corners, so each one joins exactly two sectors
+            if run and (not grid.is_walkable(*a) or not grid.is_walkable(*b) or
+                        self.cluster_of(a) != self.cluster_of(run[-1][0])):
+                self._add_entrance(run)
+                run = []
+            if grid.is_walkable(*a) and grid.is_walkable(*b):
+                run.append((a, b))
+        if run:
+            self._add_entrance(run)
+
+    def _build_intra_edges(self):
+        for cluster, nodes in self.cluster_nodes.items():
+            bounds = self._bounds(cluster)
+            for node in nodes:
+                distances, _ = self._search(self.nodes[node], bounds)
+                for other in nodes:
+                    if other != node and self.nodes[other] in distances:
+                        self.edges[node].append((other, distances[self.nodes[other]]))
+
+    def _search(self, start, bounds, goal=None):
+        """Breadth-first search confined to bounds; stops early once goal is reached"""
+        x0, y0, x1, y1 = bounds
+        grid = self.game_map
+        distances = {start: 0}
+        came_from = {}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            if current == goal:
+                break
+            step = distances[current] + 1
+            for dx, dy in DIRECTIONS:
+                nx, ny = current[0] + dx, current[1] + dy
+                if (x0 <= nx < x1 and y0 <= ny < y1 and (nx, ny) not in distances and
+                        grid.is_walkable(nx, ny)):
+                    distances[(nx, ny)] = step
+                    came_from[(nx, ny)] = current
+                    queue.append((nx, ny))
+        self.expanded += len(distances)
+        return distances, came_from
+
+    def _local_path(self, start, goal):
+        """Shortest path from start to goal without leaving start's sector, or []"""
+        if start == goal:
+            return [start]
+        if self.cluster_of(start) != self.cluster_of(goal):
+            # Consecutive cells on either side of a sector border
+            return [start, goal]
+        _, came_from = self._search(start, self._bounds(self.cluster_of(start)), goal)
+        if goal not in came_from:
+            return []
+        path = [goal]
+        while path[-1] != start:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        return path
+
+    def reachable(self, start: Tuple[int, int], goal: Tuple[int, int]) -> bool:
+        grid = self.game_map
+        if not grid.is_walkable(*start) or not grid.is_walkable(*goal):
+            return False
+        width = grid.width
+        return self.components[start[1] * width + start[0]] == self.components[goal[1] * width + goal[0]]
+
+    def _links(self, pos):
+        """Distances from pos to the transitions of its own sector"""
+        distances, _ = self._search(pos, self._bounds(self.cluster_of(pos)))
+        links = {}
+        for node in self.cluster_nodes.get(self.cluster_of(pos), ()):
+            if self.nodes[node] in distances:
+                links[node] = distances[self.nodes[node]]
+        return links
+
+    def _abstract_path(self, start, goal):
+        """A* over the transitions; returns the waypoints between start and goal, or None"""
+        goal_links = self._links(goal)
+
+        def heuristic(pos):
+            return abs(pos[0] - goal[0]) + abs(pos[1] - goal[1])
+
+        open_set = []
+        best = {}
+        came_from = {}
+        for node, cost in self._links(start).items():
+            best[node] = cost
+            came_from[node] = None
+            heappush(open_set, (cost + heuristic(self.nodes[node]), cost, node))
+
+        best_goal, goal_parent = None, None
+        while open_set:
+            estimate, cost, node = heappop(open_set)
+            self.expanded += 1
+            if best_goal is not None and estimate >= best_goal:
+                break
+            if cost > best[node]:
+                continue
+            if node in goal_links and (best_goal is None or cost + goal_links[node] < best_goal):
+                best_goal, goal_parent = cost + goal_links[node], node
+            for other, weight in self.edges[node]:
+                tentative = cost + weight
+                if tentative < best.get(other, float('inf')):
+                    best[other] = tentative
+                    came_from[other] = node
+                    heappush(open_set, (tentative + heuristic(self.nodes[other]), tentative, other))
+
+        if goal_parent is None:
+            return None
+        waypoints = []
+        node = goal_parent
+        while node is not None:
+            waypoints.append(self.nodes[node])
+            node = came_from[node]
+        waypoints.reverse()
+        return waypoints
+
+    def find_path(self, start: Tuple[int, int], goal: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Path from start toward goal, refined only for its first refine_steps cells
+
+        The returned path ends at goal when the goal is that close, otherwise it is a
+        prefix of the route. Unreachable goals and walls return [] without any search.
+        """
+        if start == goal:
+            return [start]
+        if not self.reachable(start, goal):
+            return []
+        if self.cluster_of(start) == self.cluster_of(goal):
+            path = self._local_path(start, goal)
+            if path:
+                return path
+
+        waypoints = self._abstract_path(start, goal)
+        if waypoints is None:
+            return []
+        path = [start]
+        for waypoint in waypoints + [goal]:
+            path.extend(self._local_path(path[-1], waypoint)[1:])
+            if len(path) > self.refine_steps:
+                break
+        return path
+
+    def next_step(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        path = self.find_path(start, goal)
+        if not path:
+            return None
+        return path[1] if len(path) > 1 else start
@@ -1,3 +1,15 @@
+import struct
+import zlib
+
+from src.game.grid import Grid
+
+MAGIC = b'PMAP'
+VERSION = 1
+# magic, version, width, height, player x, player y, ghost count
+HEADER = struct.Struct('<4sBHHHHI')
+POSITION = struct.Struct('<HH')
+
+
 class Map:
     def __init__(self):
         self.predefined = [
@@ -33,3 +45,63 @@ class Map:
             [1, 2, 1, 1, 1, 2, 1, 2, 1, 1, 1, 1, 1, 1, 1, 2, 1, 2, 1, 1, 1, 1, 1, 1, 1, 2, 1, 2, 1, 2, 1, 1],
             [1, 4, 2, 2, 2, 2, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2, 1, 2, 2, 4, 1, 1],
             [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]]
+
+
+    def grid(self):
+        return Grid.from_rows(self.predefined)
+
+
+def find_player_start(game_map):
+    """Player start recorded when the grid was built or loaded, no board scan needed"""
+    return game_map.player_start
+
+
+def find_ghost_starts(game_map):
+    """Ghost starts recorded when the grid was built or loaded, no board scan needed"""
+    return list(game_map.ghost_starts)
+
+
+def save_map(game_map, path):
+    """Write a grid to the binary map format
+
+    Layout: a fixed header (magic, version, size, player start, ghost count),
+    one (x, y) pair per ghost start, then the wall and dot layers packed to
+    one bit per cell and zlib-compressed together.
+    """
+    import numpy as np
+
+    size = game_map.width * game_map.height
+    layers = np.concatenate([
+        np.frombuffer(game_map.walls, dtype=np.uint8)[:size],
+        np.frombuffer(game_map.dots.cell_bytes(), dtype=np.uint8)[:size],
+    ]) != 0
+    player_x, player_y = game_map.player_start
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, game_map.width, game_map.height,
+                            player_x, player_y, len(game_map.ghost_starts)))
+        for x, y in game_map.ghost_starts:
+            f.write(POSITION.pack(x, y))
+        f.write(zlib.compress(np.packbits(layers).tobytes()))
+
+
+def load_map(path):
+    """Read a grid written by save_map"""
+    import numpy as np
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, width, height, player_x, player_y, ghost_count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a map file")
+    if version != VERSION:
+        raise ValueError(f"Unsupported map version {version} in {path}")
+
+    offset = HEADER.size
+    ghost_starts = []
+    for _ in range(ghost_count):
+        ghost_starts.append(POSITION.unpack_from(data, offset))
+        offset += POSITION.size
+
+    size = width * height
+    bits = np.unpackbits(np.frombuffer(zlib.decompress(data[offset:]), dtype=np.uint8), count=2 * size)
+    return Grid(width, height, bits[:size].tobytes(), bits[size:].tobytes(), (player_x, player_y), ghost_starts)
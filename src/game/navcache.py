@@ -0,0 +1,206 @@
+"""Persistent cache of the navigation structures derived from a map
+
+    python -m src.game.navcache warm --map maps/large.pmap
+    python -m src.game.navcache info
+    python -m src.game.navcache clear
+
+The navigation table, the hierarchical planner and the walkable index only
+depend on the walls (and the player start or sector size), so each is stored
+once per map in CACHE_DIR under a content hash of what it was built from. A
+file is a fixed header, a section table and the raw arrays at aligned
+offsets. Loading maps the file read-only and wraps the sections in
+memoryviews, so nothing is parsed or copied, and processes on the same
+machine, such as sweep workers, share the same pages.
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+
+from src.game.grid import WalkableIndex
+from src.game.hierarchical import HierarchicalPathFinder
+from src.game.map import Map, load_map
+from src.game.navigation import NavigationTable, TABLE_CELL_LIMIT
+
+MAGIC = b'PNAV'
+VERSION = 1
+# magic, version, kind, content hash, section count
+HEADER = struct.Struct('<4sBB32sH')
+# typecode, offset from the start of the file, length in bytes
+SECTION = struct.Struct('<cQQ')
+ALIGNMENT = 8
+
+KIND_TABLE = 1
+KIND_WALKABLE = 2
+KIND_HIERARCHICAL = 3
+KIND_NAMES = {KIND_TABLE: 'table', KIND_WALKABLE: 'walkable', KIND_HIERARCHICAL: 'hierarchical'}
+
+
+def default_directory():
+    """PACMAN_CACHE_DIR, or pacman/ under the user's cache directory"""
+    directory = os.environ.get('PACMAN_CACHE_DIR')
+    if directory:
+        return directory
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pacman')
+
+
+def map_digest(game_map, *params) -> bytes:
+    """Hash of the size and walls of a map plus whatever else the artifact was built from"""
+    digest = hashlib.blake2b(digest_size=32)
+    digest.update(struct.pack('<HH', game_map.width, game_map.height))
+    digest.update(game_map.walls)
+    digest.update(repr(params).encode())
+    return digest.digest()
+
+
+def write_artifact(path, kind, digest, sections):
+    """Write the arrays in sections to path, replacing any earlier file atomically"""
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = bytearray(HEADER.pack(MAGIC, VERSION, kind, digest, len(sections)))
+    body = []
+    for section in sections:
+        view = memoryview(section)
+        offset += -offset % ALIGNMENT
+        table += SECTION.pack(view.format.encode(), offset, view.nbytes)
+        body.append((offset, view))
+        offset += view.nbytes
+
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(table)
+        for offset, view in body:
+            f.write(bytes(offset - f.tell()))
+            f.write(view)
+    os.replace(temporary, path)
+
+
+def read_artifact(path, kind, digest):
+    """Map path and return its sections as read-only memoryviews; ValueError if it is not the artifact asked for"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise ValueError(f"{path} is truncated")
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, file_kind, file_digest, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or file_kind != kind or file_digest != digest:
+        raise ValueError(f"{path} is not the expected cache entry")
+    view = memoryview(data)
+    sections = []
+    for i in range(count):
+        typecode, offset, size = SECTION.unpack_from(data, HEADER.size + i * SECTION.size)
+        if offset + size > len(data):
+            raise ValueError(f"{path} is truncated")
+        sections.append(view[offset:offset + size].cast(typecode.decode()))
+    return sections
+
+
+class NavigationCache:
+    """Loads navigation structures for a map from disk, building and storing them on a miss
+
+    Every structure is also kept in memory by content hash, so a new
+    Simulation of the same map, such as a retry, gets it without touching the
+    disk. A directory that cannot be written only costs the rebuild.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_directory()
+        self.loaded = {}
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, kind, digest):
+        return os.path.join(self.directory, f'{KIND_NAMES[kind]}-{digest.hex()}.nav')
+
+    def _get(self, kind, digest, build, load):
+        key = (kind, digest)
+        if key in self.loaded:
+            return self.loaded[key]
+        path = self.path(kind, digest)
+        try:
+            artifact = load(*read_artifact(path, kind, digest))
+            self.hits += 1
+        except (OSError, ValueError, TypeError):
+            artifact = build()
+            self.misses += 1
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                write_artifact(path, kind, digest, artifact.buffers())
+            except OSError:
+                pass
+        self.loaded[key] = artifact
+        return artifact
+
+    def navigation_table(self, game_map) -> NavigationTable:
+        width, height = game_map.width, game_map.height
+        return self._get(KIND_TABLE, map_digest(game_map), lambda: NavigationTable(game_map),
+                         lambda *buffers: NavigationTable.from_buffers(width, height, *buffers))
+
+    def walkable(self, game_map) -> WalkableIndex:
+        """WalkableIndex of the map with its nearest table already filled"""
+        width, height, start = game_map.width, game_map.height, game_map.player_start
+        return self._get(KIND_WALKABLE, map_digest(game_map, start),
+                         lambda: WalkableIndex(width, height, game_map.walls, start),
+                         lambda *buffers: WalkableIndex.from_buffers(width, height, *buffers))
+
+    def hierarchical(self, game_map, cluster_size=16, refine_steps=8) -> HierarchicalPathFinder:
+        return self._get(KIND_HIERARCHICAL, map_digest(game_map, cluster_size),
+                         lambda: HierarchicalPathFinder(game_map, cluster_size, refine_steps),
+                         lambda *buffers: HierarchicalPathFinder.from_buffers(game_map, cluster_size, refine_steps,
+                                                                              *buffers))
+
+    def attach(self, game_map):
+        """Give game_map, and so every copy made of it from now on, the cached walkable index"""
+        game_map.walkable = self.walkable(game_map)
+        return game_map
+
+    def entries(self):
+        """(file name, size in bytes) of every entry in the directory"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((name, os.path.getsize(os.path.join(self.directory, name)))
+                      for name in os.listdir(self.directory) if name.endswith('.nav'))
+
+    def clear(self):
+        for name, _ in self.entries():
+            os.remove(os.path.join(self.directory, name))
+        self.loaded.clear()
+
+
+_default = None
+
+
+def default_cache() -> NavigationCache:
+    """Cache shared by everything in this process, in default_directory()"""
+    global _default
+    if _default is None:
+        _default = NavigationCache()
+    return _default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the on-disk cache of map navigation structures")
+    parser.add_argument('command', choices=('warm', 'info', 'clear'))
+    parser.add_argument('--map', help="map file to warm the cache for (default: the built-in map)")
+    parser.add_argument('--directory', help="cache directory (default: PACMAN_CACHE_DIR or ~/.cache/pacman)")
+    args = parser.parse_args(argv)
+
+    cache = NavigationCache(args.directory)
+    if args.command == 'warm':
+        game_map = load_map(args.map) if args.map else Map().grid()
+        cache.walkable(game_map)
+        if game_map.walls.count(0) <= TABLE_CELL_LIMIT:
+            cache.navigation_table(game_map)
+        cache.hierarchical(game_map)
+        print(f"{cache.hits} entries already cached, {cache.misses} built in {cache.directory}")
+    elif args.command == 'info':
+        entries = cache.entries()
+        for name, size in entries:
+            print(f"{size:>12}  {name}")
+        print(f"{len(entries)} entries, {sum(size for _, size in entries)} bytes in {cache.directory}")
+    else:
+        cache.clear()
+
+
+if __name__ == '__main__':
+    main()
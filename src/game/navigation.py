@@ -0,0 +1,112 @@
+from array import array
+from collections import deque
+from typing import List, Optional, Tuple
+
+DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+UNREACHABLE = 0xFFFF
+NO_STEP = 0xFF
+# The table grows with the square of the walkable cells; beyond this it is too slow to build
+TABLE_CELL_LIMIT = 2000
+
+
+class NavigationTable:
+    """All-pairs distance and next-hop table over the walkable cells of a static map"""
+
+    def __init__(self, game_map):
+        self.width = game_map.width
+        self.height = game_map.height
+        self.cell_index = array('i', [-1]) * (self.width * self.height)
+        self.cells: List[Tuple[int, int]] = []
+        for i, wall in enumerate(game_map.walls):
+            if not wall:
+                self.cell_index[i] = len(self.cells)
+                self.cells.append((i % self.width, i // self.width))
+
+        size = len(self.cells)
+        self.distances = array('H', [UNREACHABLE]) * (size * size)
+        self.next_hops = bytearray([NO_STEP]) * (size * size)
+        self._build()
+
+    @classmethod
+    def from_buffers(cls, width, height, cell_index, distances, next_hops) -> 'NavigationTable':
+        """Table over the arrays returned by buffers(), which may be read-only views of a mapped file"""
+        table = cls.__new__(cls)
+        table.width = width
+        table.height = height
+        table.cell_index = cell_index
+        table.cells = [(i % width, i // width) for i, index in enumerate(cell_index) if index >= 0]
+        table.distances = distances
+        table.next_hops = next_hops
+        return table
+
+    def buffers(self):
+        """The flat arrays that make up the table, see from_buffers"""
+        return self.cell_index, self.distances, self.next_hops
+
+    def _build(self):
+        size = len(self.cells)
+        # Each entry is (neighbour, direction from that neighbour back to this cell)
+        neighbours = []
+        for x, y in self.cells:
+            links = []
+            for direction, (dx, dy) in enumerate(DIRECTIONS):
+                other = self.index_of((x + dx, y + dy))
+                if other >= 0:
+                    links.append((other, direction ^ 1))
+            neighbours.append(links)
+
+        distances = self.distances
+        next_hops = self.next_hops
+        for goal in range(size):
+            distances[goal * size + goal] = 0
+            queue = deque([goal])
+            while queue:
+                current = queue.popleft()
+                step = distances[current * size + goal] + 1
+                for other, back in neighbours[current]:
+                    slot = other * size + goal
+                    if distances[slot] == UNREACHABLE:
+                        distances[slot] = step
+                        next_hops[slot] = back
+                        queue.append(other)
+
+    def index_of(self, pos: Tuple[int, int]) -> int:
+        """Dense index of a walkable cell, or -1 for walls and out-of-bounds cells"""
+        x, y = pos
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.cell_index[y * self.width + x]
+        return -1
+
+    def distance(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[int]:
+        """Shortest path length between two cells, or None if there is no path"""
+        a, b = self.index_of(start), self.index_of(goal)
+        if a < 0 or b < 0:
+            return None
+        value = self.distances[a * len(self.cells) + b]
+        return None if value == UNREACHABLE else value
+
+    def next_step(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """First cell on a shortest path from start to goal, or None if there is no path"""
+        if start == goal:
+            return start
+        a, b = self.index_of(start), self.index_of(goal)
+        if a < 0 or b < 0:
+            return None
+        direction = self.next_hops[a * len(self.cells) + b]
+        if direction == NO_STEP:
+            return None
+        dx, dy = DIRECTIONS[direction]
+        return start[0] + dx, start[1] + dy
+
+    def find_path(self, start: Tuple[int, int], goal: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Full shortest path from start to goal by following next hops"""
+        if start == goal:
+            return [start]
+        if self.distance(start, goal) is None:
+            return []
+        path = [start]
+        current = start
+        while current != goal:
+            current = self.next_step(current, goal)
+            path.append(current)
+        return path
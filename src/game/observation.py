@@ -0,0 +1,228 @@
+"""NumPy (C, H, W) observations of a game for agents, kept up to date in place
+
+    observation = Observation(simulation, targets=True)
+    tensor = observation.update()  # after every step()
+
+Channels are walls, dots, player and one per GhostPersonality, optionally
+followed by ghost targets and ghost paths. Entity channels hold the number
+of entities on a cell, so ghosts sharing a cell are not lost.
+"""
+import numpy as np
+
+from src.entities.personality import GhostPersonality
+
+CHANNEL_WALLS = 0
+CHANNEL_DOTS = 1
+CHANNEL_PLAYER = 2
+GHOST_CHANNELS = {personality: 3 + i for i, personality in enumerate(GhostPersonality)}
+BASE_CHANNELS = 3 + len(GHOST_CHANNELS)
+
+
+def channel_names(targets=False, paths=False):
+    """Name of every channel, in tensor order"""
+    names = ['walls', 'dots', 'player'] + [personality.name.lower() for personality in GHOST_CHANNELS]
+    if targets:
+        names.append('targets')
+    if paths:
+        names.append('paths')
+    return names
+
+
+def allocate(num_games, game_map, targets=False, paths=False, dtype=np.float32):
+    """Preallocated (N, C, H, W) buffer, each out[i] can back one game's observation"""
+    return np.zeros((num_games, len(channel_names(targets, paths)), game_map.height, game_map.width), dtype=dtype)
+
+
+class Observation:
+    """Observation tensor of one Simulation, patched where entities moved instead of rebuilt
+
+    update() only touches the cells entities left and entered, plus the
+    player's cell for a dot eaten on this tick. The walls are only rewritten
+    at the cells in Grid.wall_changes, and the dots are resynchronised from
+    the DotLayer bits only after a reset, a restore or several ticks between
+    updates.
+
+    out may be a (C, H, W) slice of a buffer from allocate(), in which case
+    the tensor is a view into it and nothing is copied per game.
+    """
+
+    def __init__(self, simulation, targets=False, paths=False, out=None, dtype=np.float32):
+        self.simulation = simulation
+        self.targets = targets
+        self.paths = paths
+        self.names = channel_names(targets, paths)
+        self.target_channel = BASE_CHANNELS if targets else None
+        self.path_channel = BASE_CHANNELS + targets if paths else None
+
+        template = simulation.template
+        shape = (len(self.names), template.height, template.width)
+        if out is None:
+            out = np.zeros(shape, dtype=dtype)
+        elif out.shape != shape or not out.flags.c_contiguous:
+            raise ValueError(f"Output buffer must be a contiguous array of shape {shape}, not {out.shape}")
+        self.tensor = out
+        # Flat (H * W) views of each channel, indexed by y * width + x
+        self.planes = out.reshape(len(self.names), -1)
+        self.width = template.width
+        self.tensor[CHANNEL_WALLS] = np.frombuffer(template.walls, dtype=np.uint8).reshape(shape[1:])
+        self.walkable = np.frombuffer(template.dots.cells, dtype=np.int32)
+
+        self.game_map = None
+        self.tick = None
+        self.dots_eaten = 0
+        self.walls_seen = 0
+        # Flat cells last written per entity channel, cleared before the new ones are written
+        self.written = {}
+
+    def _sync_dots(self):
+        bits = np.unpackbits(np.frombuffer(self.simulation.game_map.dots.to_bytes(), dtype=np.uint8),
+                             bitorder='little')
+        self.planes[CHANNEL_DOTS, self.walkable] = bits[:len(self.walkable)]
+
+    def _sync_walls(self):
+        game_map = self.simulation.game_map
+        for x, y in game_map.wall_changes[self.walls_seen:]:
+            cell = y * self.width + x
+            self.planes[CHANNEL_WALLS, cell] = game_map.is_wall(x, y)
+            # A closed cell lost its dot
+            self.planes[CHANNEL_DOTS, cell] = game_map.has_dot(x, y)
+        self.walls_seen = len(game_map.wall_changes)
+
+    def _write(self, channel, cells):
+        """Move the counts of channel from the cells written last time to cells"""
+        old = self.written.get(channel, ())
+        if cells == old:
+            return
+        # A handful of cells per channel, where single-element updates beat NumPy's call overhead
+        plane = self.planes[channel]
+        for cell in old:
+            plane[cell] -= 1
+        for cell in cells:
+            plane[cell] += 1
+        self.written[channel] = cells
+
+    def update(self):
+        """Bring the tensor up to the simulation's current state and return it"""
+        simulation = self.simulation
+        width = self.width
+        if simulation.game_map is not self.game_map or simulation.tick < self.tick:
+            # reset() and restore() build a new grid, so everything starts over
+            self.game_map = simulation.game_map
+            self.planes[CHANNEL_WALLS] = np.frombuffer(self.game_map.walls, dtype=np.uint8)
+            self.planes[1:] = 0
+            self.written.clear()
+            self._sync_dots()
+            self.walls_seen = len(self.game_map.wall_changes)
+        elif simulation.dots_eaten != self.dots_eaten:
+            player = simulation.player
+            if simulation.dots_eaten - self.dots_eaten == 1 and simulation.tick == self.tick + 1:
+                # At most one dot is eaten a tick, on the cell the player entered
+                self.planes[CHANNEL_DOTS, player.y * width + player.x] = 0
+            else:
+                self._sync_dots()
+        if len(simulation.game_map.wall_changes) != self.walls_seen:
+            self._sync_walls()
+        self.tick = simulation.tick
+        self.dots_eaten = simulation.dots_eaten
+
+        player = simulation.player
+        self._write(CHANNEL_PLAYER, (player.y * width + player.x,))
+        by_personality = {channel: [] for channel in GHOST_CHANNELS.values()}
+        for ghost in simulation.ghosts:
+            by_personality[GHOST_CHANNELS[ghost.personality]].append(ghost.y * width + ghost.x)
+        for channel, cells in by_personality.items():
+            self._write(channel, tuple(cells))
+        if self.targets:
+            self._write(self.target_channel, tuple(ghost.target_y * width + ghost.target_x
+                                                   for ghost in simulation.ghosts))
+        if self.paths:
+            self._write_paths()
+        return self.tensor
+
+    def _write_paths(self):
+        """Update the path counts ghost by ghost, only removing the cells a ghost walked off its path"""
+        plane = self.planes[self.path_channel]
+        width = self.width
+        written = self.written.setdefault(self.path_channel, {})
+        for i, ghost in enumerate(self.simulation.ghosts):
+            path = ghost.current_path
+            old = written.get(i, [])
+            # Between replans a ghost's path is the old one with the cells it walked dropped from the front
+            walked = len(old) - len(path)
+            if walked >= 0 and old[walked:] == path:
+                removed, added = old[:walked], ()
+            else:
+                removed, added = old, path
+            for x, y in removed:
+                plane[y * width + x] -= 1
+            for x, y in added:
+                plane[y * width + x] += 1
+            written[i] = list(path)
+
+
+class BatchedObservation:
+    """(N, C, H, W) observations of every game of a BatchedSimulation, patched in place
+
+    Boards only lose dots where a player stands, so update() refreshes the dot
+    channel at the player cells and moves the entity counts, all with a few
+    whole-array operations. Ghosts of a BatchedSimulation keep no paths, so
+    only the targets channel is available.
+    """
+
+    def __init__(self, batch, targets=False, out=None, dtype=np.float32):
+        self.batch = batch
+        self.targets = targets
+        self.names = channel_names(targets)
+        shape = (batch.num_games, len(self.names), batch.height, batch.width)
+        if out is None:
+            out = np.zeros(shape, dtype=dtype)
+        elif out.shape != shape or not out.flags.c_contiguous:
+            raise ValueError(f"Output buffer must be a contiguous array of shape {shape}, not {out.shape}")
+        self.tensor = out
+        self.planes = out.reshape(batch.num_games, len(self.names), -1)
+        self.plane_size = batch.height * batch.width
+        self.games = np.arange(batch.num_games)
+        self.ghost_channels = np.array([GHOST_CHANNELS[GhostPersonality(value)] for value in batch.personalities],
+                                       dtype=np.intp)
+        self.tensor[:, CHANNEL_WALLS] = batch.initial_board == 1
+        self.written = None
+        self.sync()
+
+    def sync(self):
+        """Rebuild every channel but the walls from the boards, needed after BatchedSimulation.reset()"""
+        batch = self.batch
+        self.tensor[:, 1:] = 0
+        self.tensor[:, CHANNEL_DOTS] = batch.boards == 2
+        self.written = None
+        return self._write_entities()
+
+    def _entity_cells(self):
+        """Flat tensor index of every entity count, one row per entity slot and one column per game"""
+        batch = self.batch
+        width = batch.width
+        channels = [np.full((1, batch.num_games), CHANNEL_PLAYER, dtype=np.intp),
+                    np.broadcast_to(self.ghost_channels[:, None], batch.ghost_x.T.shape)]
+        cells = [(batch.player_y * width + batch.player_x)[None, :], (batch.ghost_y * width + batch.ghost_x).T]
+        if self.targets:
+            channels.append(np.full(batch.target_x.T.shape, BASE_CHANNELS, dtype=np.intp))
+            cells.append((batch.target_y * width + batch.target_x).T)
+        planes = self.games * len(self.names) + np.concatenate(channels)
+        return planes * self.plane_size + np.concatenate(cells)
+
+    def _write_entities(self):
+        # Row by row: a row has one entity per game, so its indices never repeat and += counts them all
+        flat = self.tensor.reshape(-1)
+        if self.written is not None:
+            for row in self.written:
+                flat[row] -= 1
+        self.written = self._entity_cells()
+        for row in self.written:
+            flat[row] += 1
+        return self.tensor
+
+    def update(self):
+        """Bring the tensor up to the boards after a step() and return it"""
+        batch = self.batch
+        under_player = batch.boards[self.games, batch.player_y, batch.player_x] == 2
+        self.planes[self.games, CHANNEL_DOTS, batch.player_y * batch.width + batch.player_x] = under_player
+        return self._write_entities()
@@ -1,7 +1,10 @@
+import functools
 from dataclasses import dataclass, field
 from heapq import heappush, heappop
 from typing import Tuple, List, Dict
 
+from src.game.navigation import DIRECTIONS
+
 
 @dataclass(order=True)
 class PriorityNode:
@@ -10,32 +13,47 @@ class PriorityNode:
 
 
 class PathFinder:
-    def __init__(self, game_map):
+    # Ghosts follow a path for this many moves before asking for a new one
+    REPLAN_INTERVAL = 5
+
+    def __init__(self, game_map, navigator=None):
         self.game_map = game_map
+        self.navigator = navigator
+        # Running totals read by the frame profiler
+        self.calls = 0
+        self.expanded = 0
 
     def get_neighbors(self, pos: Tuple[int, int]) -> List[Tuple[int, int]]:
         """Get valid neighboring positions"""
         neighbors = []
         for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
             new_x, new_y = pos[0] + dx, pos[1] + dy
-            if (0 <= new_x < len(self.game_map[0]) and
-                    0 <= new_y < len(self.game_map) and
-                    self.game_map[new_y][new_x] != 1):
+            if self.game_map.is_walkable(new_x, new_y):
                 neighbors.append((new_x, new_y))
         return neighbors
 
     def find_path(self, start: Tuple[int, int], goal: Tuple[int, int]) -> List[Tuple[int, int]]:
-        """Dijkstra's pathfinding algorithm"""
+        """Dijkstra's pathfinding algorithm, unless a precomputed navigator is attached
+
+        The navigator is a NavigationTable or a HierarchicalPathFinder built for this map.
+        """
+        self.calls += 1
+        if self.navigator is not None:
+            return self.navigator.find_path(start, goal)
+
         open_set = []
         heappush(open_set, PriorityNode(0, start))
 
         came_from: Dict[Tuple[int, int], Tuple[int, int]] = {}
         distance: Dict[Tuple[int, int], float] = {start: 0}
 
+        expanded = 0
         while open_set:
             current = heappop(open_set).position
+            expanded += 1
 
             if current == goal:
+                self.expanded += expanded
                 path = []
                 while current in came_from:
                     path.append(current)
@@ -52,4 +70,220 @@ class PathFinder:
                     distance[neighbor] = tentative_distance
                     heappush(open_set, PriorityNode(tentative_distance, neighbor))
 
+        self.expanded += expanded
         return []
+
+
+# Distance of cells the goal cannot be reached from; ints keep the search keys exact
+INFINITY = 1 << 30
+# Search keys (k1, k2) are packed as k1 << KEY_SHIFT | k2, one int compare instead of a tuple compare
+KEY_SHIFT = 32
+
+
+@functools.lru_cache(maxsize=8)
+def _neighbor_table(width, height):
+    """In-bounds neighbours of every flat cell index y * width + x, in DIRECTIONS order"""
+    return [tuple((y + dy) * width + x + dx for dx, dy in DIRECTIONS if 0 <= x + dx < width and 0 <= y + dy < height)
+            for y in range(height) for x in range(width)]
+
+
+class IncrementalPathFinder:
+    """D* Lite search for one ghost that repairs its last search instead of starting over
+
+    The search runs backwards from the goal, so the ghost walking along its
+    path costs nothing and a call with the same goal and unchanged walls returns
+    the cached path without any search. Walls toggled through Grid.set_wall only
+    re-expand the cells whose distance to the goal changed.
+
+    A goal that moved changes the distance of nearly every searched cell, and a
+    fresh search focused on the start expands fewer cells than repairing them,
+    so by default it starts over; repair_radius > 0 repairs goal moves of up to
+    that many cells instead. Starting over does not clear the search arrays, it
+    only bumps a generation, so it costs the cells searched and not the board.
+
+    Paths are read off the distances, taking the first of DIRECTIONS among the
+    neighbours one step closer to the goal, so they only depend on the start,
+    the goal and the walls and not on how the search got there.
+    """
+
+    # Asking every move is free while the goal stays put, so toggled walls are seen on the next move;
+    # ghosts still wait PathFinder.REPLAN_INTERVAL moves before planning for a goal that moved
+    REPLAN_INTERVAL = 1
+
+    def __init__(self, game_map, repair_radius=0):
+        self.game_map = game_map
+        self.repair_radius = repair_radius
+        self.calls = 0
+        self.expanded = 0
+        # Calls answered from the cached path, without touching the search
+        self.skipped = 0
+        self.width = game_map.width
+        self.neighbors = _neighbor_table(game_map.width, game_map.height)
+        self.walls = game_map.walls
+        # Search state over flat cell indices, allocated by the first search and kept from then on. A cell only
+        # holds values of the current search when its stamp is the current generation, so starting over just bumps
+        # the generation instead of clearing the arrays.
+        self.g = self.rhs = self.keys = self.stamp = None
+        self.generation = 0
+        self.open = []
+        self.goal = None
+        self.start = None
+        self.last = None
+        self.km = 0
+        self.path: List[Tuple[int, int]] = []
+        self.walls_seen = 0
+
+    def _touch(self, cell):
+        """Reset a cell left over from an earlier generation"""
+        if self.stamp[cell] != self.generation:
+            self.stamp[cell] = self.generation
+            self.g[cell] = self.rhs[cell] = INFINITY
+            self.keys[cell] = None
+
+    def _update(self, cell):
+        g, rhs, walls, stamp, generation = self.g, self.rhs, self.walls, self.stamp, self.generation
+        if stamp[cell] != generation:
+            stamp[cell] = generation
+            g[cell] = rhs[cell] = INFINITY
+            self.keys[cell] = None
+        if cell != self.goal:
+            if walls[cell]:
+                rhs[cell] = INFINITY
+            else:
+                best = INFINITY
+                for neighbor in self.neighbors[cell]:
+                    if not walls[neighbor] and stamp[neighbor] == generation and g[neighbor] < best:
+                        best = g[neighbor]
+                rhs[cell] = best + 1 if best < INFINITY else INFINITY
+        if g[cell] != rhs[cell]:
+            best = min(g[cell], rhs[cell])
+            y, x = divmod(cell, self.width)
+            key = (best + abs(x - self.start_x) + abs(y - self.start_y) + self.km) << KEY_SHIFT | best
+            self.keys[cell] = key
+            heappush(self.open, (key, cell))
+        else:
+            self.keys[cell] = None
+
+    def _restart(self, start, goal):
+        if self.g is None:
+            size = len(self.neighbors)
+            self.g = [INFINITY] * size
+            self.rhs = [INFINITY] * size
+            self.keys = [None] * size
+            self.stamp = [0] * size
+        self.generation += 1
+        self.open = []
+        self.km = 0
+        self.goal = goal
+        self._touch(start)
+        self._touch(goal)
+        self.rhs[goal] = 0
+        self._update(goal)
+
+    def _compute(self):
+        g, rhs, keys, open_set, walls = self.g, self.rhs, self.keys, self.open, self.walls
+        neighbors, update, start = self.neighbors, self._update, self.start
+        expanded = 0
+        while open_set:
+            key, cell = open_set[0]
+            if keys[cell] != key:
+                heappop(open_set)  # Superseded by a later push or already consistent
+                continue
+            best = min(g[start], rhs[start])
+            if key >= (best + self.km) << KEY_SHIFT | best and rhs[start] == g[start]:
+                break
+            heappop(open_set)
+            expanded += 1
+            best = min(g[cell], rhs[cell])
+            y, x = divmod(cell, self.width)
+            new_key = (best + abs(x - self.start_x) + abs(y - self.start_y) + self.km) << KEY_SHIFT | best
+            if key < new_key:
+                keys[cell] = new_key
+                heappush(open_set, (new_key, cell))
+            elif g[cell] > rhs[cell]:
+                g[cell] = rhs[cell]
+                keys[cell] = None
+                for neighbor in neighbors[cell]:
+                    if not walls[neighbor]:
+                        update(neighbor)
+            else:
+                g[cell] = INFINITY
+                update(cell)
+                for neighbor in neighbors[cell]:
+                    if not walls[neighbor]:
+                        update(neighbor)
+        self.expanded += expanded
+
+    def _extract(self, start):
+        g, walls, neighbors, width = self.g, self.walls, self.neighbors, self.width
+        stamp, generation = self.stamp, self.generation
+        distance = g[start]
+        if distance == INFINITY or distance != self.rhs[start]:
+            return []
+        path = [(start % width, start // width)]
+        cell = start
+        while cell != self.goal:
+            distance -= 1
+            cell = next((n for n in neighbors[cell]
+                         if not walls[n] and stamp[n] == generation and g[n] == distance), None)
+            if cell is None:
+                return []
+            path.append((cell % width, cell // width))
+        return path
+
+    def find_path(self, start: Tuple[int, int], goal: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Shortest path from start to goal including both ends, [] when there is none"""
+        self.calls += 1
+        game_map = self.game_map
+        changes = game_map.wall_changes[self.walls_seen:]
+        self.walls_seen = len(game_map.wall_changes)
+        # set_wall swaps the immutable walls for a bytearray on the first toggle
+        self.walls = game_map.walls
+        width = self.width
+        goal_cell = goal[1] * width + goal[0]
+
+        if goal_cell == self.goal and not changes:
+            if start in self.path:
+                # Still on the cached path, which is the path the search would give from here
+                self.skipped += 1
+                self.start = start[1] * width + start[0]
+                self.path = self.path[self.path.index(start):]
+                return self.path
+            if start[1] * width + start[0] == self.start:
+                self.skipped += 1
+                return self.path
+
+        if not game_map.is_walkable(*start) or not game_map.is_walkable(*goal):
+            self.goal = None
+            self.path = []
+            return self.path
+
+        start_cell = start[1] * width + start[0]
+        if self.goal is None:
+            moved = None
+        else:
+            old_y, old_x = divmod(self.goal, width)
+            moved = abs(goal[0] - old_x) + abs(goal[1] - old_y)
+        if moved is None or moved > self.repair_radius:
+            self.start, (self.start_x, self.start_y) = start_cell, start
+            self.last = start
+            self._restart(start_cell, goal_cell)
+        else:
+            self.km += abs(start[0] - self.last[0]) + abs(start[1] - self.last[1])
+            self.start, (self.start_x, self.start_y) = start_cell, start
+            self.last = start
+            self._touch(start_cell)
+            if goal_cell != self.goal:
+                old_goal, self.goal = self.goal, goal_cell
+                self._touch(goal_cell)
+                self.rhs[goal_cell] = 0
+                self._update(goal_cell)
+                self._update(old_goal)
+            for x, y in changes:
+                cell = y * width + x
+                self._update(cell)
+                for neighbor in self.neighbors[cell]:
+                    self._update(neighbor)
+        self._compute()
+        self.path = self._extract(start_cell)
+        return self.path
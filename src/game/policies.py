@@ -0,0 +1,107 @@
+import random
+from collections import deque
+
+from src.game.navigation import DIRECTIONS
+
+
+class RandomPolicy:
+    """Keeps its direction and turns at random now and then, like an aimless player"""
+
+    def __init__(self, seed=None, turn_chance=0.05):
+        self.rng = random.Random(seed)
+        self.turn_chance = turn_chance
+
+    def __call__(self, simulation):
+        if simulation.tick == 0 or self.rng.random() < self.turn_chance:
+            return self.rng.choice(DIRECTIONS)
+        return None
+
+
+class GreedyPolicy:
+    """Heads for the nearest dot along the shortest path that keeps clear of the ghosts
+
+    Cells holding a ghost or next to one are avoided while another route
+    exists. A new direction is chosen only when the player has entered a new
+    cell, since the direction it already has stays latched until then.
+    """
+
+    def __init__(self, seed=None):
+        self.last_cell = None
+
+    def __call__(self, simulation):
+        player = simulation.player
+        cell = (player.x, player.y)
+        if cell == self.last_cell:
+            return None
+        self.last_cell = cell
+
+        game_map = simulation.game_map
+        danger = set()
+        for ghost in simulation.ghosts:
+            danger.add((ghost.x, ghost.y))
+            for dx, dy in DIRECTIONS:
+                danger.add((ghost.x + dx, ghost.y + dy))
+        return self._first_step(game_map, cell, danger) or self._first_step(game_map, cell, set())
+
+    @staticmethod
+    def _first_step(game_map, start, danger):
+        """Direction of the first move towards the nearest reachable dot, or None"""
+        first = {}
+        queue = deque()
+        for dx, dy in DIRECTIONS:
+            cell = (start[0] + dx, start[1] + dy)
+            if game_map.is_walkable(*cell) and cell not in danger:
+                first[cell] = (dx, dy)
+                queue.append(cell)
+        while queue:
+            x, y = queue.popleft()
+            if game_map.has_dot(x, y):
+                return first[(x, y)]
+            for dx, dy in DIRECTIONS:
+                cell = (x + dx, y + dy)
+                if cell not in first and cell != start and cell not in danger and game_map.is_walkable(*cell):
+                    first[cell] = first[(x, y)]
+                    queue.append(cell)
+        return None
+
+
+class NearestDotPolicy:
+    """Follows the shortest path to the dot the DotLayer reports as nearest, ignoring the ghosts
+
+    The nearest-dot query only looks at blocks of the board that still hold
+    dots, so unlike GreedyPolicy its cost does not grow with the empty area
+    the player has cleared. The path is only planned again once its dot is gone.
+    A nearest dot that cannot be reached, e.g. walled off by toggle_wall, falls
+    back to GreedyPolicy's search for the nearest reachable one.
+    """
+
+    def __init__(self, seed=None):
+        self.last_cell = None
+        self.target = None
+        self.path = []
+
+    def __call__(self, simulation):
+        player = simulation.player
+        cell = (player.x, player.y)
+        if cell == self.last_cell:
+            return None
+        self.last_cell = cell
+
+        if self.path and self.path[0] == cell:
+            self.path.pop(0)
+        dots = simulation.game_map.dots
+        if self.target is None or not dots.has(*self.target) or not self.path:
+            self.target = dots.nearest(*cell)
+            # Without the start cell, and a copy since the navigator may hand out paths it keeps cached
+            self.path = simulation.pathfinder.find_path(cell, self.target)[1:] if self.target else []
+            if not self.path:
+                return GreedyPolicy._first_step(simulation.game_map, cell, set())
+        next_x, next_y = self.path[0]
+        return next_x - cell[0], next_y - cell[1]
+
+
+POLICIES = {
+    'random': RandomPolicy,
+    'greedy': GreedyPolicy,
+    'nearest': NearestDotPolicy,
+}
@@ -0,0 +1,129 @@
+import json
+import time
+from collections import deque
+
+# Phases that make up one frame of Game.run, in the order they are shown
+FRAME_PHASES = ('frame', 'events', 'simulation', 'player', 'ghosts', 'ghost_ai', 'collision',
+                'draw', 'overlay', 'display')
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = self.profiler.clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.name, self.start, self.profiler.clock())
+        return False
+
+
+class FrameProfiler:
+    """Per-phase frame timings with rolling percentiles and Chrome trace export
+
+    Code under measurement wraps each phase in `with profiler.phase(name):`.
+    While the profiler is disabled that returns a shared do-nothing context
+    manager, so instrumented code costs one method call per phase. Enabled, the
+    time of every phase is summed per frame, the last window frames are kept
+    for percentiles and each phase is logged as a trace event.
+
+    Ghost searches are reported with count_search(); the pathfinder calls and
+    nodes expanded of the last frame are kept per ghost and summed per frame.
+    """
+
+    def __init__(self, window=240, trace_limit=200000, clock=time.perf_counter):
+        self.enabled = False
+        self.window = window
+        self.clock = clock
+        self.history = {}
+        self.current = {}
+        self.searches = {}
+        self.last_searches = {}
+        self.trace = deque(maxlen=trace_limit)
+        self.frame_start = None
+        self.origin = clock()
+
+    def phase(self, name):
+        if not self.enabled:
+            return NULL_PHASE
+        return _Phase(self, name)
+
+    def add(self, name, start, end, trace=True):
+        """Count end - start seconds towards name in the current frame"""
+        self.current[name] = self.current.get(name, 0.0) + end - start
+        if trace:
+            self.trace.append(('X', name, start, end))
+
+    def count_search(self, ghost, calls, expanded):
+        counts = self.searches.setdefault(ghost, [0, 0])
+        counts[0] += calls
+        counts[1] += expanded
+
+    def begin_frame(self):
+        self.frame_start = self.clock() if self.enabled else None
+        # Drop anything measured after the profiler was switched on halfway through a frame
+        self.current = {}
+        self.searches = {}
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        end = self.clock()
+        self.add('frame', self.frame_start, end)
+        self.current['pathfinder_calls'] = sum(calls for calls, _ in self.searches.values())
+        self.current['nodes_expanded'] = sum(expanded for _, expanded in self.searches.values())
+        self.trace.append(('C', 'pathfinding', end, {
+            'calls': self.current['pathfinder_calls'], 'nodes': self.current['nodes_expanded']}))
+
+        # Phases that did not run this frame count as zero, e.g. a frame without a due tick
+        for name in self.history.keys() | self.current.keys():
+            samples = self.history.setdefault(name, deque(maxlen=self.window))
+            samples.append(self.current.get(name, 0.0))
+        self.current = {}
+        self.last_searches = self.searches
+        self.searches = {}
+        self.frame_start = None
+
+    def percentile(self, name, q):
+        """q-th percentile (0-100) of the per-frame totals of name over the window, or None"""
+        samples = self.history.get(name)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(q / 100 * len(ordered)), len(ordered) - 1)]
+
+    def summary(self):
+        """(name, p50, p95, p99, max) for every recorded phase and counter, phases in frame order"""
+        names = [name for name in FRAME_PHASES if name in self.history]
+        names += sorted(self.history.keys() - set(FRAME_PHASES))
+        return [(name, self.percentile(name, 50), self.percentile(name, 95), self.percentile(name, 99),
+                 max(self.history[name])) for name in names]
+
+    def export_trace(self, path):
+        """Write the trace in the Chrome trace event format (chrome://tracing, Perfetto)"""
+        events = []
+        for kind, name, start, value in self.trace:
+            event = {'name': name, 'ph': kind, 'ts': (start - self.origin) * 1e6, 'pid': 0, 'tid': 0}
+            if kind == 'X':
+                event['dur'] = (value - start) * 1e6
+            else:
+                event['args'] = value
+            events.append(event)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
@@ -0,0 +1,208 @@
+"""Recording and deterministic replay of Simulation games
+
+    python -m src.game.replay game.prec --map maps/large.pmap
+"""
+import argparse
+import bisect
+import struct
+import zlib
+
+from src.game.map import Map, load_map
+from src.game.simulation import Simulation, PATHFINDING_MODES
+
+MAGIC = b'PREC'
+VERSION = 4
+# magic, version, pathfinding mode, seed, map checksum, length in ticks, input, wall toggle and checkpoint counts
+HEADER = struct.Struct('<4sBBQIIIII')
+# tick the input was applied on, direction code
+INPUT = struct.Struct('<IB')
+# tick the toggle was applied before, cell
+TOGGLE = struct.Struct('<IHH')
+# tick, snapshot length
+CHECKPOINT = struct.Struct('<II')
+
+# Direction codes of recorded inputs; (0, 0) is the stop key
+ACTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0), (0, 0))
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+
+def map_checksum(game_map):
+    """CRC of everything in a grid that affects play, to match recordings to their map"""
+    crc = zlib.crc32(struct.pack('<HH', game_map.width, game_map.height))
+    crc = zlib.crc32(game_map.walls, crc)
+    crc = zlib.crc32(game_map.dots.cell_bytes(), crc)
+    crc = zlib.crc32(repr((game_map.player_start, list(game_map.ghost_starts))).encode(), crc)
+    return crc
+
+
+class Recording:
+    """Seed, tick-stamped inputs and wall toggles and optional state checkpoints of one game"""
+
+    def __init__(self, seed, pathfinding, checksum, ticks=0, inputs=None, checkpoints=None, toggles=None):
+        self.seed = seed
+        self.pathfinding = pathfinding
+        self.checksum = checksum
+        self.ticks = ticks
+        self.inputs = inputs if inputs is not None else []
+        self.checkpoints = checkpoints if checkpoints is not None else []
+        self.toggles = toggles if toggles is not None else []
+
+    def to_bytes(self) -> bytes:
+        """Fixed header followed by the zlib-compressed inputs, wall toggles and checkpoints"""
+        body = bytearray()
+        for tick, action in self.inputs:
+            body += INPUT.pack(tick, ACTION_CODES[action])
+        for tick, x, y in self.toggles:
+            body += TOGGLE.pack(tick, x, y)
+        for tick, snapshot in self.checkpoints:
+            body += CHECKPOINT.pack(tick, len(snapshot)) + snapshot
+        header = HEADER.pack(MAGIC, VERSION, PATHFINDING_MODES.index(self.pathfinding), self.seed,
+                             self.checksum, self.ticks, len(self.inputs), len(self.toggles),
+                             len(self.checkpoints))
+        return header + zlib.compress(bytes(body))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Recording':
+        magic, version, mode, seed, checksum, ticks, input_count, toggle_count, checkpoint_count = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a recording")
+        if version != VERSION:
+            raise ValueError(f"Unsupported recording version {version}")
+
+        body = zlib.decompress(data[HEADER.size:])
+        inputs = []
+        offset = 0
+        for _ in range(input_count):
+            tick, code = INPUT.unpack_from(body, offset)
+            inputs.append((tick, ACTIONS[code]))
+            offset += INPUT.size
+        toggles = []
+        for _ in range(toggle_count):
+            toggles.append(TOGGLE.unpack_from(body, offset))
+            offset += TOGGLE.size
+        checkpoints = []
+        for _ in range(checkpoint_count):
+            tick, size = CHECKPOINT.unpack_from(body, offset)
+            offset += CHECKPOINT.size
+            checkpoints.append((tick, body[offset:offset + size]))
+            offset += size
+        return cls(seed, PATHFINDING_MODES[mode], checksum, ticks, inputs, checkpoints, toggles)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path) -> 'Recording':
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class Recorder:
+    """Drives a Simulation like the game loop does and records what it is given
+
+    Every checkpoint_interval ticks (0 for never) a snapshot is stored so that
+    a Replayer can seek without replaying from the start.
+    """
+
+    def __init__(self, simulation, checkpoint_interval=0):
+        self.simulation = simulation
+        self.checkpoint_interval = checkpoint_interval
+        self.recording = None
+
+    def reset(self, seed=None):
+        state = self.simulation.reset(seed)
+        self.recording = Recording(self.simulation.seed, self.simulation.pathfinding,
+                                   map_checksum(self.simulation.template))
+        return state
+
+    def step(self, action=None):
+        simulation = self.simulation
+        if action is not None:
+            self.recording.inputs.append((simulation.tick + 1, tuple(action)))
+        result = simulation.step(action)
+        self.recording.ticks = simulation.tick
+        if self.checkpoint_interval and simulation.tick % self.checkpoint_interval == 0 and not simulation.done:
+            self.recording.checkpoints.append((simulation.tick, simulation.snapshot()))
+        return result
+
+    def toggle_wall(self, x, y):
+        """Simulation.toggle_wall(), recorded when the cell changed"""
+        changed = self.simulation.toggle_wall(x, y)
+        if changed:
+            self.recording.toggles.append((self.simulation.tick + 1, x, y))
+        return changed
+
+
+class Replayer:
+    """Re-runs a recording headless, as fast as the simulation steps"""
+
+    def __init__(self, recording, game_map=None):
+        template = game_map if game_map is not None else Map().grid()
+        if map_checksum(template) != recording.checksum:
+            raise ValueError("Recording was made on a different map")
+        self.recording = recording
+        self.simulation = Simulation(template, recording.pathfinding)
+        self.input_ticks = [tick for tick, _ in recording.inputs]
+        self.toggle_ticks = [tick for tick, _, _ in recording.toggles]
+        self.checkpoint_ticks = [tick for tick, _ in recording.checkpoints]
+        self.rewind()
+
+    def rewind(self):
+        self.simulation.reset(self.recording.seed)
+        self.cursor = 0
+        self.toggle_cursor = 0
+
+    @property
+    def tick(self):
+        return self.simulation.tick
+
+    def step(self):
+        """Advance one tick with the toggles and input recorded for it; returns step()'s (state, events)"""
+        toggles = self.recording.toggles
+        while self.toggle_cursor < len(toggles) and toggles[self.toggle_cursor][0] == self.simulation.tick + 1:
+            self.simulation.toggle_wall(*toggles[self.toggle_cursor][1:])
+            self.toggle_cursor += 1
+        action = None
+        inputs = self.recording.inputs
+        if self.cursor < len(inputs) and inputs[self.cursor][0] == self.simulation.tick + 1:
+            action = inputs[self.cursor][1]
+            self.cursor += 1
+        return self.simulation.step(action)
+
+    def seek(self, tick):
+        """Move to the given tick, jumping to the last checkpoint before it when that saves work"""
+        if tick > self.recording.ticks:
+            raise ValueError(f"Recording only has {self.recording.ticks} ticks")
+        i = bisect.bisect_right(self.checkpoint_ticks, tick) - 1
+        if i >= 0 and (self.checkpoint_ticks[i] > self.simulation.tick or tick < self.simulation.tick):
+            self.simulation.restore(self.recording.checkpoints[i][1])
+            self.cursor = bisect.bisect_right(self.input_ticks, self.simulation.tick)
+            self.toggle_cursor = bisect.bisect_right(self.toggle_ticks, self.simulation.tick)
+        elif tick < self.simulation.tick:
+            self.rewind()
+        while self.simulation.tick < tick and not self.simulation.done:
+            self.step()
+        return self.simulation.state()
+
+    def run(self):
+        """Fast-forward to the end of the recording and return the final state"""
+        return self.seek(self.recording.ticks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded game headless")
+    parser.add_argument('recording')
+    parser.add_argument('--map', help="map file the game was recorded on (default: the built-in map)")
+    parser.add_argument('--tick', type=int, help="stop at this tick instead of the end")
+    args = parser.parse_args(argv)
+
+    recording = Recording.load(args.recording)
+    replayer = Replayer(recording, load_map(args.map) if args.map else None)
+    state = replayer.seek(args.tick) if args.tick is not None else replayer.run()
+    print(f"tick {state['tick']}: dots eaten {state['dots_eaten']}, score {state['score']}, done {state['done']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import time
+from fractions import Fraction
+
+from src.game.constants import TICK_RATE, MAX_CATCHUP_TICKS
+
+
+class MoveTimer:
+    """Turns a speed in cells per second into single-cell moves on the fixed simulation tick
+
+    The speed is kept as an exact ratio of ticks, so 30/7 cells per second at 30
+    ticks per second moves on exactly every 7th tick however long the game runs.
+    Speeds above one cell per tick are capped at one.
+    """
+
+    def __init__(self, speed, tick_rate=TICK_RATE):
+        ratio = min(Fraction(speed / tick_rate).limit_denominator(1000), Fraction(1))
+        self.numerator = ratio.numerator
+        self.denominator = ratio.denominator
+        self.progress = 0
+
+    def advance(self) -> bool:
+        """Count one tick; True when the entity is due to move this tick"""
+        self.progress += self.numerator
+        if self.progress >= self.denominator:
+            self.progress -= self.denominator
+            return True
+        return False
+
+    def fraction(self, alpha=0.0) -> float:
+        """How far the entity is through its current move, alpha being the elapsed part of the next tick"""
+        return min((self.progress + alpha * self.numerator) / self.denominator, 1.0)
+
+
+class FixedTimestep:
+    """Wall-clock driven scheduler that runs the simulation at a fixed tick rate
+
+    advance() reports how many ticks are due since the last frame, so a slow
+    frame is caught up with several ticks instead of slowing the game down. A
+    frame later than max_ticks ticks drops the rest of the backlog (counted in
+    dropped) rather than letting the catch-up grow without bound. alpha is the
+    fraction of the next tick that has already elapsed, for interpolation.
+    """
+
+    def __init__(self, tick_rate=TICK_RATE, max_ticks=MAX_CATCHUP_TICKS, clock=time.perf_counter):
+        self.dt = 1.0 / tick_rate
+        self.max_ticks = max_ticks
+        self.clock = clock
+        self.accumulator = 0.0
+        self.last = None
+        self.dropped = 0
+
+    def advance(self) -> int:
+        now = self.clock()
+        if self.last is not None:
+            self.accumulator += now - self.last
+        self.last = now
+
+        ticks = int(self.accumulator // self.dt)
+        self.accumulator -= ticks * self.dt
+        if ticks > self.max_ticks:
+            self.dropped += ticks - self.max_ticks
+            ticks = self.max_ticks
+        return ticks
+
+    @property
+    def alpha(self) -> float:
+        return min(self.accumulator / self.dt, 1.0)
@@ -0,0 +1,349 @@
+import random
+import struct
+from array import array
+
+from src.entities.ghost import Ghost, GhostPersonality
+from src.entities.player import Player
+from src.game.constants import PLAYER_SPEED, GHOST_SPEED, DOT_SCORE
+from src.game.flowfield import FlowFieldService
+from src.game.hierarchical import HierarchicalPathFinder
+from src.game.map import Map, find_player_start, find_ghost_starts
+from src.game.navigation import NavigationTable, TABLE_CELL_LIMIT
+from src.game.pathfinder import PathFinder, IncrementalPathFinder
+from src.game.profiler import FrameProfiler
+from src.game.scheduler import MoveTimer
+
+EVENT_DOT_EATEN = 'dot_eaten'
+EVENT_DEATH = 'death'
+EVENT_LEVEL_COMPLETE = 'level_complete'
+
+PATHFINDING_MODES = ('auto', 'dijkstra', 'table', 'hierarchical', 'flowfield', 'incremental')
+# Modes without structures precomputed from the walls, the only ones toggle_wall() works with
+DYNAMIC_MODES = ('dijkstra', 'incremental')
+
+# Lengths of the integer fields, RNG state, dot layer and walls that make up a snapshot
+SNAPSHOT_HEADER = struct.Struct('<IIII')
+
+
+class Simulation:
+    """Display-free game state that advances one fixed simulation tick per step
+
+    game_map is the Grid every reset starts from (defaults to Map.predefined) and
+    pathfinding selects how ghosts plan: 'table' shares one NavigationTable,
+    'hierarchical' shares one HierarchicalPathFinder, 'dijkstra' searches from
+    scratch on every replan and 'auto' uses the table when the map is small
+    enough for it and the hierarchical planner otherwise. 'flowfield' has every
+    ghost except RANDOM ones read its next step from flow fields shared per
+    target and plans the RANDOM ghosts like 'auto'. 'incremental' gives every
+    ghost its own IncrementalPathFinder, which repairs its previous search
+    when walls were toggled and skips the search when neither the walls nor
+    the target changed.
+
+    toggle_wall() opens and closes cells during a game, for doors and
+    destructible walls; it needs 'dijkstra' or 'incremental' pathfinding.
+
+    With a NavigationCache the table, the hierarchical planner and the
+    walkable index of the map are memory-mapped from disk when they were built
+    before, by this or any other process.
+
+    Ghosts get the personalities in order, repeating the sequence (all four by
+    default). Every entity moves at its own speed in cells per second, converted
+    to moves on the TICK_RATE tick by a MoveTimer, and positions(alpha) reports
+    where each one is along its current move for smooth rendering.
+
+    Dots live in the map's DotLayer, which keeps the remaining count as they
+    are eaten; the tick that eats the last one scores it, ends the game and
+    reports EVENT_LEVEL_COMPLETE without looking at the rest of the board.
+
+    All randomness comes from one random.Random per game seeded in reset(), so
+    a seed and the inputs given to step() reproduce a game exactly.
+
+    step() reports its player and ghost phases to profiler, a FrameProfiler
+    that is disabled unless one is passed in and turned on.
+    """
+
+    def __init__(self, game_map=None, pathfinding='auto', profiler=None, personalities=None,
+                 player_speed=PLAYER_SPEED, ghost_speed=GHOST_SPEED, cache=None):
+        if pathfinding not in PATHFINDING_MODES:
+            raise ValueError(f"Unknown pathfinding mode: {pathfinding}")
+        self.personalities = list(personalities or GhostPersonality)
+        self.player_speed = player_speed
+        self.ghost_speed = ghost_speed
+        self.template = game_map if game_map is not None else Map().grid()
+        # NavigationCache the navigation structures are loaded from instead of built, if any
+        self.cache = cache
+        if cache is not None:
+            cache.attach(self.template)
+        fits_table = self.template.walls.count(0) <= TABLE_CELL_LIMIT
+        if pathfinding == 'auto':
+            pathfinding = 'table' if fits_table else 'hierarchical'
+        self.pathfinding = pathfinding
+        # Flow fields only steer ghosts that share targets, RANDOM ghosts still use this planner
+        self.planner = pathfinding
+        if pathfinding == 'flowfield':
+            self.planner = 'table' if fits_table else 'hierarchical'
+        self.navigator = None
+        self.pathfinder = None
+        self.flow_fields = None
+        self.profiler = profiler or FrameProfiler()
+        self.seed = None
+        self.rng = None
+        self.game_map = None
+        self.player = None
+        self.ghosts = []
+        self.tick = 0
+        self.dots_eaten = 0
+        self.score = 0
+        self.done = False
+        self.level_complete = False
+        self.player_timer = None
+        self.ghost_timers = []
+        self.origins = {}
+
+    def reset(self, seed=None):
+        if seed is None:
+            # Chained from the previous game, so a seeded run of several games stays reproducible
+            seed = (self.rng or random).getrandbits(32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        player_pos = find_player_start(self.template)
+        if not player_pos:
+            raise ValueError("No player start position found!")
+        self.game_map = self.template.copy()
+        self.player = Player(player_pos[0], player_pos[1], self.player_speed)
+        self.game_map.occupancy.add(self.player)
+
+        # Walls are identical on every reset, so the navigator is built only once
+        if self.navigator is None and self.planner == 'table':
+            self.navigator = (self.cache.navigation_table(self.template) if self.cache is not None
+                              else NavigationTable(self.template))
+        elif self.navigator is None and self.planner == 'hierarchical':
+            self.navigator = (self.cache.hierarchical(self.template) if self.cache is not None
+                              else HierarchicalPathFinder(self.template))
+        self.pathfinder = PathFinder(self.game_map, self.navigator)
+        if self.flow_fields is None and self.pathfinding == 'flowfield':
+            self.flow_fields = FlowFieldService(self.template)
+
+        self.ghosts = []
+        personalities = self.personalities
+        for i, pos in enumerate(find_ghost_starts(self.template)):
+            personality = personalities[i % len(personalities)]
+            ghost = Ghost(pos[0], pos[1], personality, self._planner(), self.flow_fields, self.ghost_speed, self.rng)
+            self.game_map.occupancy.add(ghost)
+            self.ghosts.append(ghost)
+
+        self.tick = 0
+        self.dots_eaten = 0
+        self.score = 0
+        self.done = False
+        self.level_complete = False
+        self.player_timer = MoveTimer(self.player.speed)
+        self.ghost_timers = [MoveTimer(ghost.speed) for ghost in self.ghosts]
+        # Cell each entity left on its last move, the start point for interpolation
+        self.origins = {entity: (entity.x, entity.y) for entity in [self.player] + self.ghosts}
+        return self.state()
+
+    def step(self, action=None):
+        """Advance one tick; action is a (dx, dy) direction for the player, or None for no input"""
+        if self.done:
+            raise RuntimeError("Simulation is over, call reset() first")
+
+        events = []
+        if action is not None:
+            self.player.set_next_direction(*action)
+
+        self.tick += 1
+        occupancy = self.game_map.occupancy
+        occupancy.begin_tick()
+
+        profiler = self.profiler
+        with profiler.phase('player'):
+            if self.player_timer.advance():
+                self.origins[self.player] = (self.player.x, self.player.y)
+                if self.player.update(self.game_map):
+                    if self.game_map.eat_dot(self.player.x, self.player.y):
+                        self.dots_eaten += 1
+                        self.score += DOT_SCORE
+                        events.append((EVENT_DOT_EATEN, self.player.x, self.player.y))
+                    # Lowest index rather than cell order, which a restored snapshot does not keep
+                    caught = [self.ghosts.index(entity) for entity in occupancy.at(self.player.x, self.player.y)
+                              if entity is not self.player]
+                    if caught:
+                        self.done = True
+                        events.append((EVENT_DEATH, min(caught)))
+                        return self.state(), events
+            # Outside the move, toggle_wall may have closed the cell of the last dot
+            if not self.game_map.dots.remaining:
+                self.done = self.level_complete = True
+                events.append((EVENT_LEVEL_COMPLETE, self.score))
+                return self.state(), events
+
+        with profiler.phase('ghosts'):
+            if self.flow_fields is not None:
+                self.flow_fields.begin_tick()
+            for i, ghost in enumerate(self.ghosts):
+                if not self.ghost_timers[i].advance():
+                    continue
+                self.origins[ghost] = (ghost.x, ghost.y)
+                if profiler.enabled:
+                    collided = self._profiled_ghost_move(i, ghost)
+                else:
+                    dx, dy = ghost.calculate_move(self.player.x, self.player.y, self.game_map)
+                    ghost.move(dx, dy, self.game_map)
+                    collided = occupancy.collides(ghost, self.player)
+
+                if collided:
+                    self.done = True
+                    events.append((EVENT_DEATH, i))
+                    break
+
+        return self.state(), events
+
+    def _planner(self):
+        """Pathfinder for the next ghost: its own search state in 'incremental' mode, the shared one otherwise"""
+        if self.pathfinding != 'incremental':
+            return self.pathfinder
+        return IncrementalPathFinder(self.game_map)
+
+    def toggle_wall(self, x, y):
+        """Open a wall or close an open cell before the next step; returns whether the cell changed
+
+        Cells with an entity on them are not closed, and a dot under a new wall
+        is removed. Only the 'dijkstra' and 'incremental' modes plan on the
+        current walls, the other modes precompute from the walls at the start.
+        """
+        if self.pathfinding not in DYNAMIC_MODES:
+            raise ValueError(f"Walls cannot change with '{self.pathfinding}' pathfinding")
+        game_map = self.game_map
+        if not game_map.in_bounds(x, y):
+            return False
+        close = not game_map.is_wall(x, y)
+        if close and game_map.occupancy.at(x, y):
+            return False
+        return game_map.set_wall(x, y, close)
+
+    @staticmethod
+    def search_counters(ghost):
+        """Pathfinder calls and nodes expanded so far by the planners a ghost uses, which other ghosts may share"""
+        calls = expanded = 0
+        for planner in (ghost.pathfinder, getattr(ghost.pathfinder, 'navigator', None), ghost.flow_fields):
+            calls += getattr(planner, 'calls', 0)
+            expanded += getattr(planner, 'expanded', 0)
+        return calls, expanded
+
+    def _profiled_ghost_move(self, i, ghost):
+        """One ghost move with its AI and collision times and its search work reported to the profiler"""
+        profiler = self.profiler
+        calls, expanded = self.search_counters(ghost)
+        start = profiler.clock()
+        dx, dy = ghost.calculate_move(self.player.x, self.player.y, self.game_map)
+        ghost.move(dx, dy, self.game_map)
+        moved = profiler.clock()
+        collided = self.game_map.occupancy.collides(ghost, self.player)
+        end = profiler.clock()
+
+        # Per-ghost spans would flood the trace, the enclosing 'ghosts' phase is traced instead
+        profiler.add('ghost_ai', start, moved, trace=False)
+        profiler.add('collision', moved, end, trace=False)
+        after_calls, after_expanded = self.search_counters(ghost)
+        profiler.count_search(i, after_calls - calls, after_expanded - expanded)
+        return collided
+
+    def positions(self, alpha=0.0):
+        """Fractional cell position of every entity, alpha being the elapsed part of the next tick
+
+        An entity is drawn at the cell it left and slides into its current cell
+        over the time its next move takes, so motion is continuous at any frame rate.
+        """
+        positions = {}
+        timers = [(self.player, self.player_timer)] + list(zip(self.ghosts, self.ghost_timers))
+        for entity, timer in timers:
+            origin_x, origin_y = self.origins[entity]
+            t = timer.fraction(alpha)
+            positions[entity] = (origin_x + (entity.x - origin_x) * t, origin_y + (entity.y - origin_y) * t)
+        return positions
+
+    def snapshot(self) -> bytes:
+        """Everything that decides how the game continues, encoded for restore()
+
+        Path caches and timers are included, navigation structures are not since
+        they only depend on the walls.
+        """
+        player = self.player
+        values = [self.tick, self.dots_eaten, self.score, int(self.done), int(self.level_complete),
+                  player.x, player.y, *player.direction, *player.next_direction, self.player_timer.progress,
+                  *self.origins[player], len(self.ghosts)]
+        for ghost, timer in zip(self.ghosts, self.ghost_timers):
+            values += [ghost.x, ghost.y, ghost.target_x, ghost.target_y, ghost.path_update_counter,
+                       ghost.stuck_counter, *ghost.last_position, timer.progress, *self.origins[ghost],
+                       len(ghost.current_path)]
+            for x, y in ghost.current_path:
+                values += [x, y]
+        ints = array('i', values).tobytes()
+        _, state, _ = self.rng.getstate()
+        rng = array('I', state).tobytes()
+        dots = self.game_map.dots.to_bytes()
+        # Only stored once a wall was toggled, the template has them otherwise
+        walls = bytes(self.game_map.walls) if self.game_map.wall_changes else b''
+        return SNAPSHOT_HEADER.pack(len(ints), len(rng), len(dots), len(walls)) + ints + rng + dots + walls
+
+    def restore(self, snapshot: bytes):
+        """Return to a state taken by snapshot() on a simulation of the same map and mode"""
+        int_size, rng_size, dot_size, wall_size = SNAPSHOT_HEADER.unpack_from(snapshot)
+        offset = SNAPSHOT_HEADER.size
+        values = array('i')
+        values.frombytes(snapshot[offset:offset + int_size])
+        offset += int_size
+        state = array('I')
+        state.frombytes(snapshot[offset:offset + rng_size])
+        offset += rng_size
+        dots = snapshot[offset:offset + dot_size]
+        offset += dot_size
+        walls = snapshot[offset:offset + wall_size]
+
+        if self.player is None:
+            self.reset(0)
+        self.game_map = self.template.copy()
+        self.game_map.dots.load_bytes(dots)
+        if walls:
+            for i, (wall, template_wall) in enumerate(zip(walls, self.template.walls)):
+                if wall != template_wall:
+                    self.game_map.set_wall(i % self.game_map.width, i // self.game_map.width, wall)
+        self.rng.setstate((3, tuple(state), None))
+
+        values = iter(values)
+        self.tick, self.dots_eaten, self.score = next(values), next(values), next(values)
+        self.done, self.level_complete = bool(next(values)), bool(next(values))
+        player = self.player
+        player.x, player.y = next(values), next(values)
+        player.direction = (next(values), next(values))
+        player.next_direction = (next(values), next(values))
+        self.player_timer.progress = next(values)
+        self.origins = {player: (next(values), next(values))}
+        if next(values) != len(self.ghosts):
+            raise ValueError("Snapshot was taken on a map with a different number of ghosts")
+        self.game_map.occupancy.add(player)
+
+        self.pathfinder = PathFinder(self.game_map, self.navigator)
+        for ghost, timer in zip(self.ghosts, self.ghost_timers):
+            ghost.x, ghost.y, ghost.target_x, ghost.target_y = next(values), next(values), next(values), next(values)
+            ghost.path_update_counter, ghost.stuck_counter = next(values), next(values)
+            ghost.last_position = (next(values), next(values))
+            timer.progress = next(values)
+            self.origins[ghost] = (next(values), next(values))
+            ghost.current_path = [(next(values), next(values)) for _ in range(next(values))]
+            ghost.pathfinder = self._planner()
+            self.game_map.occupancy.add(ghost)
+
+    def state(self):
+        return {
+            'tick': self.tick,
+            'player': (self.player.x, self.player.y),
+            'ghosts': [(ghost.x, ghost.y, ghost.personality) for ghost in self.ghosts],
+            'dots_eaten': self.dots_eaten,
+            'dots_remaining': self.game_map.dots.remaining,
+            'score': self.score,
+            'done': self.done,
+            'level_complete': self.level_complete,
+        }
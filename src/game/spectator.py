@@ -0,0 +1,443 @@
+"""Live spectating of games over TCP: a keyframe on connect, then one compact delta per tick
+
+    python -m src.game.spectator serve --port 8765 --policy greedy
+    python -m src.game.spectator watch 127.0.0.1:8765
+    python -m src.game.spectator check --ticks 3000
+
+Every message is a FRAME header (kind, payload length) and its payload. A
+keyframe holds the whole game: size, tick, score, flags, every entity and the
+zlib-compressed wall and dot layers. A delta holds the tick, score and flags
+and only what changed on that tick: the cells of eaten dots, the entities
+that moved and the walls toggled. Deltas are encoded once per tick and shared by every spectator.
+"""
+import argparse
+import asyncio
+import random
+import socket
+import struct
+import threading
+import zlib
+from collections import deque
+
+from src.game.constants import TICK_RATE
+from src.game.map import Map, load_map
+from src.game.policies import POLICIES
+from src.game.simulation import Simulation, EVENT_DOT_EATEN, PATHFINDING_MODES
+
+# kind, payload length
+FRAME = struct.Struct('<BI')
+KIND_KEYFRAME = 1
+KIND_DELTA = 2
+# width, height, tick, score, flags, entity count
+KEYFRAME = struct.Struct('<HHIIBH')
+# x, y, kind: 0 for the player, the GhostPersonality value for a ghost
+ENTITY = struct.Struct('<HHB')
+# tick, score, flags, eaten dot count, moved entity count, toggled wall count
+DELTA = struct.Struct('<IIBHHH')
+CELL = struct.Struct('<HH')
+# entity index (0 is the player, then the ghosts in order), x, y
+MOVE = struct.Struct('<HHH')
+# x, y, whether the cell is now a wall
+TOGGLE = struct.Struct('<HHB')
+
+FLAG_DONE = 1
+FLAG_LEVEL_COMPLETE = 2
+
+# Kernel socket buffer per spectator in bytes, a few seconds of deltas
+SEND_BUFFER = 8192
+# Rough size of a delta frame, turns queue_limit into the bytes the transport may hold before drain() blocks
+DELTA_BYTES = 64
+
+
+def _flags(simulation):
+    return (FLAG_DONE if simulation.done else 0) | (FLAG_LEVEL_COMPLETE if simulation.level_complete else 0)
+
+
+def _entities(simulation):
+    player = simulation.player
+    return [(player.x, player.y, 0)] + [(ghost.x, ghost.y, ghost.personality.value) for ghost in simulation.ghosts]
+
+
+def encode_keyframe(simulation) -> bytes:
+    game_map = simulation.game_map
+    entities = _entities(simulation)
+    payload = bytearray(KEYFRAME.pack(game_map.width, game_map.height, simulation.tick, simulation.score,
+                                      _flags(simulation), len(entities)))
+    for entity in entities:
+        payload += ENTITY.pack(*entity)
+    payload += zlib.compress(game_map.walls + game_map.dots.cell_bytes())
+    return FRAME.pack(KIND_KEYFRAME, len(payload)) + payload
+
+
+def encode_delta(simulation, eaten, moves, toggles=()) -> bytes:
+    payload = bytearray(DELTA.pack(simulation.tick, simulation.score, _flags(simulation), len(eaten), len(moves),
+                                   len(toggles)))
+    for cell in eaten:
+        payload += CELL.pack(*cell)
+    for move in moves:
+        payload += MOVE.pack(*move)
+    for x, y in toggles:
+        payload += TOGGLE.pack(x, y, simulation.game_map.is_wall(x, y))
+    return FRAME.pack(KIND_DELTA, len(payload)) + payload
+
+
+class _Spectator:
+    """Frames waiting to be written to one connection"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        # Deltas only make sense on top of a keyframe, so none are sent until one was
+        self.synced = False
+
+    def send(self, frame):
+        self.queue.append(frame)
+        self.ready.set()
+
+    async def pump(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.queue:
+                self.writer.write(self.queue.popleft())
+                # Blocks while the socket is backed up, which is what lets the queue grow
+                await self.writer.drain()
+
+
+class SpectatorServer:
+    """asyncio TCP server that streams the game handed to publish() to every connected spectator
+
+    The game loop calls publish() after each tick, from the server's event
+    loop or, with start_in_thread(), from any other thread. A spectator that
+    falls more than queue_limit frames behind has its queue dropped and is
+    sent the next keyframe instead, so a slow connection never holds back the
+    game or the other spectators. The frames buffered below the queue, in the
+    transport (about queue_limit deltas) and in the kernel (send_buffer bytes),
+    are capped too, since they would otherwise hide a lagging spectator for
+    hundreds of ticks before its queue starts to grow.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, queue_limit=2 * TICK_RATE, send_buffer=SEND_BUFFER):
+        self.host = host
+        self.port = port
+        self.queue_limit = queue_limit
+        self.send_buffer = send_buffer
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.spectators = set()
+        self.handlers = set()
+        # Only ever increased by the server loop and read by publish(), so no lock is needed
+        self.keyframe_requests = 0
+        self.keyframes_served = 0
+        self.dropped = 0
+        # What spectators were last sent, the base of the next delta
+        self.game_map = None
+        self.tick = None
+        self.dots_eaten = 0
+        self.entities = []
+        self.walls_seen = 0
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        for spectator in list(self.spectators):
+            spectator.writer.close()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        await self.server.wait_closed()
+
+    def start_in_thread(self):
+        """Run the server on its own event loop in a daemon thread, for a game loop that is not async"""
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name='spectators', daemon=True)
+        self.thread.start()
+        started.wait()
+
+    async def _serve(self, reader, writer):
+        if self.send_buffer:
+            writer.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        # asyncio's default of 64 KiB would take a thousand deltas before drain() blocks and the queue grows
+        writer.transport.set_write_buffer_limits(high=self.queue_limit * DELTA_BYTES)
+        spectator = _Spectator(writer)
+        self.handlers.add(asyncio.current_task())
+        self.spectators.add(spectator)
+        self.keyframe_requests += 1
+        # Spectators never send anything, reading only notices when they hang up
+        tasks = [asyncio.ensure_future(spectator.pump()), asyncio.ensure_future(reader.read())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.spectators.discard(spectator)
+            self.handlers.discard(asyncio.current_task())
+            writer.close()
+
+    def publish(self, simulation, events=()):
+        """Stream the tick step() just ran; events are the ones it returned
+
+        Anything that is not the next tick of the same game, such as a
+        reset(), a restore() or a tick that was never published, is sent as a
+        keyframe to everyone.
+        """
+        if self.loop is None:
+            return
+        entities = _entities(simulation)
+        eaten = [(event[1], event[2]) for event in events if event[0] == EVENT_DOT_EATEN]
+        wall_changes = simulation.game_map.wall_changes
+        continues = (simulation.game_map is self.game_map and simulation.tick == self.tick + 1 and
+                     simulation.dots_eaten - self.dots_eaten == len(eaten) and len(entities) == len(self.entities))
+
+        delta = keyframe = None
+        if continues:
+            moves = [(i, x, y) for i, ((x, y, _), (old_x, old_y, _)) in enumerate(zip(entities, self.entities))
+                     if (x, y) != (old_x, old_y)]
+            delta = encode_delta(simulation, eaten, moves, wall_changes[self.walls_seen:])
+            requests = self.keyframe_requests
+            if requests != self.keyframes_served:
+                keyframe = encode_keyframe(simulation)
+                self.keyframes_served = requests
+        else:
+            keyframe = encode_keyframe(simulation)
+        self.game_map, self.tick, self.dots_eaten, self.entities = (simulation.game_map, simulation.tick,
+                                                                    simulation.dots_eaten, entities)
+        self.walls_seen = len(wall_changes)
+        self.loop.call_soon_threadsafe(self._broadcast, keyframe, delta)
+
+    def _broadcast(self, keyframe, delta):
+        for spectator in self.spectators:
+            if spectator.synced and delta is not None:
+                spectator.send(delta)
+            elif keyframe is not None:
+                spectator.send(keyframe)
+                spectator.synced = True
+            if len(spectator.queue) > self.queue_limit:
+                # Lagging: everything it has not been sent yet is replaced by the next keyframe
+                spectator.queue.clear()
+                spectator.synced = False
+                self.keyframe_requests += 1
+                self.dropped += 1
+
+
+class SpectatorClient:
+    """Reference spectator that rebuilds the game from the stream"""
+
+    def __init__(self):
+        self.width = self.height = 0
+        self.walls = bytearray()
+        self.dots = bytearray()
+        self.entities = []
+        self.tick = None
+        self.score = 0
+        self.flags = 0
+        self.keyframes = 0
+        self.deltas = 0
+        self.reader = None
+        self.writer = None
+
+    async def connect(self, host, port, receive_buffer=None):
+        """Open the connection; receive_buffer shrinks the socket buffer, to play a slow spectator"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if receive_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, (host, port))
+        self.reader, self.writer = await asyncio.open_connection(sock=sock)
+
+    def close(self):
+        self.writer.close()
+
+    async def receive(self):
+        """Read and apply one frame, returns its kind"""
+        kind, size = FRAME.unpack(await self.reader.readexactly(FRAME.size))
+        self.apply(kind, await self.reader.readexactly(size))
+        return kind
+
+    def apply(self, kind, payload):
+        if kind == KIND_KEYFRAME:
+            self.width, self.height, self.tick, self.score, self.flags, count = KEYFRAME.unpack_from(payload)
+            offset = KEYFRAME.size
+            self.entities = [ENTITY.unpack_from(payload, offset + i * ENTITY.size) for i in range(count)]
+            layers = zlib.decompress(payload[offset + count * ENTITY.size:])
+            cells = self.width * self.height
+            self.walls, self.dots = bytearray(layers[:cells]), bytearray(layers[cells:])
+            self.keyframes += 1
+        elif kind == KIND_DELTA:
+            self.tick, self.score, self.flags, eaten, moved, toggled = DELTA.unpack_from(payload)
+            offset = DELTA.size
+            for _ in range(eaten):
+                x, y = CELL.unpack_from(payload, offset)
+                self.dots[y * self.width + x] = 0
+                offset += CELL.size
+            for _ in range(moved):
+                i, x, y = MOVE.unpack_from(payload, offset)
+                self.entities[i] = (x, y, self.entities[i][2])
+                offset += MOVE.size
+            for _ in range(toggled):
+                x, y, wall = TOGGLE.unpack_from(payload, offset)
+                self.walls[y * self.width + x] = wall
+                if wall:
+                    # A closed cell lost its dot
+                    self.dots[y * self.width + x] = 0
+                offset += TOGGLE.size
+            self.deltas += 1
+        else:
+            raise ValueError(f"Unknown frame kind {kind}")
+
+    def mismatches(self, simulation):
+        """Names of everything the rebuilt game gets wrong about simulation, empty when it matches"""
+        wrong = []
+        if self.tick != simulation.tick:
+            wrong.append('tick')
+        if self.score != simulation.score or self.flags != _flags(simulation):
+            wrong.append('score')
+        if self.walls != simulation.game_map.walls:
+            wrong.append('walls')
+        if self.dots != simulation.game_map.dots.cell_bytes():
+            wrong.append('dots')
+        if self.entities != _entities(simulation):
+            wrong.append('entities')
+        return wrong
+
+
+async def serve(simulation, policy_class, server, tick_rate=TICK_RATE, pause=2.0):
+    """Play bot games forever at tick_rate, publishing every tick; a finished game restarts after pause seconds"""
+    while True:
+        simulation.reset()
+        server.publish(simulation)
+        policy = policy_class(simulation.seed)
+        while not simulation.done:
+            _, events = simulation.step(policy(simulation))
+            server.publish(simulation, events)
+            await asyncio.sleep(1 / tick_rate)
+        await asyncio.sleep(pause)
+
+
+async def check(simulation, policy_class, ticks, spectators=3, toggle_every=0):
+    """Stream ticks of bot games as fast as the spectators keep up and compare what they rebuild
+
+    The first spectator is deliberately slow, so that it falls behind and has to
+    recover from a keyframe. Returns the server, whose dropped count shows how
+    often that happened. With toggle_every, a random cell is toggled every that
+    many ticks, which needs a simulation whose pathfinding allows toggle_wall().
+    """
+    rng = random.Random(0)
+    server = SpectatorServer(queue_limit=8, send_buffer=4096)
+    await server.start()
+    clients = [SpectatorClient() for _ in range(spectators)]
+    for i, client in enumerate(clients):
+        await client.connect('127.0.0.1', server.port, receive_buffer=1024 if i == 0 else None)
+    while len(server.spectators) < spectators:
+        await asyncio.sleep(0.01)
+
+    finished = []
+
+    async def follow_slowly(client):
+        while not (finished and client.keyframes and not client.mismatches(simulation)):
+            await client.receive()
+            await asyncio.sleep(0.005)
+
+    slow = asyncio.ensure_future(follow_slowly(clients[0]))
+    try:
+        played = 0
+        while played < ticks:
+            simulation.reset()
+            policy = policy_class(simulation.seed)
+            events = []
+            while True:
+                server.publish(simulation, events)
+                # A spectator that keeps up is sent exactly one frame per publish
+                for client in clients[1:]:
+                    await client.receive()
+                    wrong = client.mismatches(simulation)
+                    if wrong:
+                        raise AssertionError(f"Spectator is wrong about {', '.join(wrong)} at tick {simulation.tick}")
+                if simulation.done or played == ticks:
+                    break
+                if toggle_every and played % toggle_every == 0:
+                    simulation.toggle_wall(rng.randrange(simulation.game_map.width),
+                                           rng.randrange(simulation.game_map.height))
+                _, events = simulation.step(policy(simulation))
+                played += 1
+
+        finished.append(True)
+        while not slow.done():
+            # Publishing the same tick again is a keyframe for everyone, the slow spectator included
+            server.publish(simulation)
+            await asyncio.wait([slow], timeout=0.05)
+        slow.result()
+    finally:
+        slow.cancel()
+        for client in clients:
+            client.close()
+        await server.close()
+    return server, clients
+
+
+async def watch(host, port):
+    client = SpectatorClient()
+    await client.connect(host, port)
+    try:
+        while True:
+            kind = await client.receive()
+            if kind == KIND_KEYFRAME or client.tick % TICK_RATE == 0:
+                print(f"tick {client.tick}: score {client.score}, player {client.entities[0][:2]}, "
+                      f"{sum(client.dots)} dots left ({client.keyframes} keyframes, {client.deltas} deltas)")
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream live games to spectators over TCP")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help="play bot games and stream them")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    watch_parser = commands.add_parser('watch', help="follow a stream and print what it rebuilds")
+    watch_parser.add_argument('address', help="host:port of a server")
+    check_parser = commands.add_parser('check', help="stream over localhost and verify the rebuilt games")
+    check_parser.add_argument('--ticks', type=int, default=3000)
+    check_parser.add_argument('--toggle-every', type=int, default=0,
+                              help="toggle a random cell every this many ticks, needs dynamic --pathfinding")
+    for command in (serve_parser, check_parser):
+        command.add_argument('--map', help="map file written by save_map (default: the built-in map)")
+        command.add_argument('--policy', choices=sorted(POLICIES), default='greedy')
+        command.add_argument('--pathfinding', choices=PATHFINDING_MODES, default='auto')
+    args = parser.parse_args(argv)
+
+    if args.command == 'watch':
+        host, port = args.address.rsplit(':', 1)
+        asyncio.run(watch(host, int(port)))
+        return
+
+    simulation = Simulation(load_map(args.map) if args.map else Map().grid(), args.pathfinding)
+    if args.command == 'serve':
+        async def run():
+            server = SpectatorServer(args.host, args.port)
+            await server.start()
+            print(f"Streaming on {server.host}:{server.port}")
+            await serve(simulation, POLICIES[args.policy], server)
+
+        asyncio.run(run())
+    else:
+        server, clients = asyncio.run(check(simulation, POLICIES[args.policy], args.ticks,
+                                            toggle_every=args.toggle_every))
+        print(f"{args.ticks} ticks matched; {server.dropped} lagging spectator queues dropped, "
+              f"{sum(client.keyframes for client in clients)} keyframes and "
+              f"{sum(client.deltas for client in clients)} deltas received")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Run many seeded headless games across a process pool and summarise them
+
+    python -m src.game.sweep runs.jsonl --games 10000 --policy greedy --workers 8
+    python -m src.game.sweep runs.jsonl --summary
+
+Every finished game is appended to the output as one JSON line, so an
+interrupted sweep is resumed by running the same command again: seeds
+already in the file are skipped. The first line records the configuration
+and a resumed sweep must use the same one.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+from multiprocessing import Pool
+
+from src.entities.ghost import GhostPersonality
+from src.game.constants import PLAYER_SPEED, GHOST_SPEED, TICK_RATE
+from src.game.map import Map, load_map
+from src.game.navcache import default_cache
+from src.game.policies import POLICIES
+from src.game.simulation import Simulation, EVENT_DEATH, PATHFINDING_MODES
+
+# State of each worker process, built once by _init_worker and reused for every game it runs
+_worker = {}
+
+
+def _init_worker(config):
+    game_map = load_map(config['map']) if config['map'] else Map().grid()
+    personalities = [GhostPersonality[name] for name in config['personalities']] or None
+    # Workers map the same cache files, so the navigation structures are built once and their pages shared
+    _worker['simulation'] = Simulation(game_map, config['pathfinding'], personalities=personalities,
+                                       player_speed=config['player_speed'], ghost_speed=config['ghost_speed'],
+                                       cache=default_cache())
+    _worker['config'] = config
+
+
+def play(simulation, policy, seed, max_ticks):
+    """Play one game to the end or max_ticks and return its result record"""
+    simulation.reset(seed)
+    caught_by = None
+    while not simulation.done and simulation.tick < max_ticks:
+        _, events = simulation.step(policy(simulation))
+        for event in events:
+            if event[0] == EVENT_DEATH:
+                caught_by = event[1]
+    return {
+        'seed': seed,
+        'ticks': simulation.tick,
+        'dots_eaten': simulation.dots_eaten,
+        'score': simulation.score,
+        'died': simulation.done and not simulation.level_complete,
+        'cleared': simulation.level_complete,
+        'ghost': caught_by,
+        'personality': simulation.ghosts[caught_by].personality.name if caught_by is not None else None,
+    }
+
+
+def _run_chunk(seeds):
+    simulation = _worker['simulation']
+    config = _worker['config']
+    policy_class = POLICIES[config['policy']]
+    return [play(simulation, policy_class(seed), seed, config['max_ticks']) for seed in seeds]
+
+
+def load_results(path, config=None):
+    """Results already in path; raises if the file was written with a different config"""
+    results = []
+    if not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for number, line in enumerate(f):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # A line cut short by an interrupted run
+            if number == 0:
+                if config is not None and entry.get('config') != config:
+                    raise ValueError(f"{path} was written by a sweep with a different configuration")
+            else:
+                results.append(entry)
+    return results
+
+
+def summarize(results):
+    """Aggregate statistics of a list of game results"""
+    if not results:
+        return {'games': 0}
+    ticks = sorted(result['ticks'] for result in results)
+    deaths = [result for result in results if result['died']]
+    by_personality, by_ghost = {}, {}
+    for result in deaths:
+        by_personality[result['personality']] = by_personality.get(result['personality'], 0) + 1
+        by_ghost[result['ghost']] = by_ghost.get(result['ghost'], 0) + 1
+    return {
+        'games': len(results),
+        'deaths': len(deaths),
+        'survived': len(results) - len(deaths),
+        'cleared': sum(1 for result in results if result.get('cleared')),
+        'survival_ticks': {
+            'mean': statistics.fmean(ticks),
+            'median': statistics.median(ticks),
+            'p95': ticks[min(int(0.95 * len(ticks)), len(ticks) - 1)],
+            'max': ticks[-1],
+        },
+        'dots_eaten': {
+            'mean': statistics.fmean(result['dots_eaten'] for result in results),
+            'max': max(result['dots_eaten'] for result in results),
+        },
+        'caught_by_personality': by_personality,
+        'caught_by_ghost': {str(ghost): count for ghost, count in sorted(by_ghost.items())},
+    }
+
+
+def sweep(config, path, games, first_seed=0, workers=None, chunk_size=16, progress=None):
+    """Play seeds first_seed .. first_seed + games - 1 that path does not hold yet, appending each result"""
+    done = {result['seed'] for result in load_results(path, config)}
+    seeds = [seed for seed in range(first_seed, first_seed + games) if seed not in done]
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+
+    if os.path.exists(path):
+        # Drop a line cut short by an interrupted run before appending after it, possibly the header itself
+        with open(path, 'rb+') as f:
+            f.truncate(f.read().rfind(b'\n') + 1)
+    with open(path, 'a') as f:
+        if f.tell() == 0:
+            f.write(json.dumps({'config': config}) + '\n')
+            f.flush()
+        # Built once here, so the workers map the cache files instead of each building the same structures
+        _init_worker(config)
+        _worker['simulation'].reset(first_seed)
+        with Pool(workers, _init_worker, (config,)) as pool:
+            finished = len(done)
+            for results in pool.imap_unordered(_run_chunk, chunks):
+                for result in results:
+                    f.write(json.dumps(result) + '\n')
+                # Flushed per chunk, so an interruption loses at most the chunks still running
+                f.flush()
+                finished += len(results)
+                if progress is not None:
+                    progress(finished, len(done) + len(seeds))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run seeded headless games across a process pool")
+    parser.add_argument('output', help="JSON lines file the results are appended to")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--map', help="map file written by save_map (default: the built-in map)")
+    parser.add_argument('--pathfinding', choices=PATHFINDING_MODES, default='auto')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='greedy')
+    parser.add_argument('--personalities', nargs='+', choices=[p.name for p in GhostPersonality], default=[],
+                        help="personalities given to the ghosts in turn (default: all four)")
+    parser.add_argument('--player-speed', type=float, default=PLAYER_SPEED, help="cells per second")
+    parser.add_argument('--ghost-speed', type=float, default=GHOST_SPEED, help="cells per second")
+    parser.add_argument('--max-ticks', type=int, default=5 * 60 * TICK_RATE,
+                        help="games still running are cut off here")
+    parser.add_argument('--workers', type=int, help="processes to use (default: one per core)")
+    parser.add_argument('--chunk-size', type=int, default=16, help="games handed to a worker at a time")
+    parser.add_argument('--summary', action='store_true', help="only print the statistics of the output file")
+    args = parser.parse_args(argv)
+
+    if not args.summary:
+        config = {
+            'map': args.map,
+            'pathfinding': args.pathfinding,
+            'policy': args.policy,
+            'personalities': args.personalities,
+            'player_speed': args.player_speed,
+            'ghost_speed': args.ghost_speed,
+            'max_ticks': args.max_ticks,
+        }
+
+        def progress(finished, total):
+            print(f"\r{finished}/{total} games", end='', file=sys.stderr)
+
+        sweep(config, args.output, args.games, args.first_seed, args.workers, args.chunk_size, progress)
+        print(file=sys.stderr)
+
+    print(json.dumps(summarize(load_results(args.output)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
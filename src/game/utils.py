@@ -1,53 +1,37 @@
 import pygame
 
+from src.entities.ghost import Ghost
 from src.game.constants import CELL_SIZE, BLUE, BLACK, WHITE, YELLOW, GHOST_COLORS
-
-
-def draw_map(screen, game_map, ghosts):
-    ghost_positions = {(ghost.x, ghost.y): ghost.personality for ghost in ghosts}
-
-    for y in range(len(game_map)):
-        for x in range(len(game_map[y])):
-            cell = game_map[y][x]
-            rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-
-            if cell == 1:  # Wall
+from src.game.map import find_player_start, find_ghost_starts  # noqa: F401
+
+
+def draw_map(screen, game_map, camera=None):
+    """Draw every cell in view of camera (the whole board from its top-left corner without one)"""
+    occupancy = game_map.occupancy
+    if camera is not None:
+        x0, y0, x1, y1 = camera.visible_cells()
+        left, top = camera.x, camera.y
+    else:
+        x0, y0, x1, y1 = 0, 0, game_map.width, game_map.height
+        left = top = 0
+
+    for y in range(y0, y1):
+        for x in range(x0, x1):
+            rect = pygame.Rect(x * CELL_SIZE - left, y * CELL_SIZE - top, CELL_SIZE, CELL_SIZE)
+            center = (rect.x + CELL_SIZE // 2, rect.y + CELL_SIZE // 2)
+            entities = occupancy.at(x, y)
+
+            if game_map.is_wall(x, y):
                 pygame.draw.rect(screen, BLUE, rect)
-            elif cell == 2:  # Dot
-                pygame.draw.rect(screen, BLACK, rect)
-                pygame.draw.circle(screen, WHITE,
-                                   (x * CELL_SIZE + CELL_SIZE // 2,
-                                    y * CELL_SIZE + CELL_SIZE // 2),
-                                   CELL_SIZE // 6)
-            elif cell == 3:  # Player
+            elif entities:
                 pygame.draw.rect(screen, BLACK, rect)
-                pygame.draw.circle(screen, YELLOW,
-                                   (x * CELL_SIZE + CELL_SIZE // 2,
-                                    y * CELL_SIZE + CELL_SIZE // 2),
-                                   CELL_SIZE // 2)
-            elif cell == 4:  # Ghost
+                ghosts = [entity for entity in entities if isinstance(entity, Ghost)]
+                if len(ghosts) < len(entities):  # Player
+                    pygame.draw.circle(screen, YELLOW, center, CELL_SIZE // 2)
+                else:  # Ghost
+                    pygame.draw.circle(screen, GHOST_COLORS[ghosts[-1].personality], center, CELL_SIZE // 2)
+            elif game_map.has_dot(x, y):
                 pygame.draw.rect(screen, BLACK, rect)
-                ghost_color = GHOST_COLORS[ghost_positions[(x, y)]]
-                pygame.draw.circle(screen, ghost_color,
-                                   (x * CELL_SIZE + CELL_SIZE // 2,
-                                    y * CELL_SIZE + CELL_SIZE // 2),
-                                   CELL_SIZE // 2)
+                pygame.draw.circle(screen, WHITE, center, CELL_SIZE // 6)
             else:  # Empty space
                 pygame.draw.rect(screen, BLACK, rect)
-
-
-def find_player_start(game_map):
-    for y in range(len(game_map)):
-        for x in range(len(game_map[y])):
-            if game_map[y][x] == 3:
-                return x, y
-    return None
-
-
-def find_ghost_starts(game_map):
-    ghost_positions = []
-    for y in range(len(game_map)):
-        for x in range(len(game_map[y])):
-            if game_map[y][x] == 4:
-                ghost_positions.append((x, y))
-    return ghost_positions
@@ -0,0 +1,25 @@
+import functools
+
+import pygame
+
+# Composed full-screen frames of the menu screens, see Screen.frame
+frames = {}
+
+
+@functools.lru_cache(maxsize=None)
+def font(size):
+    """Default font at size, loaded from disk once per process"""
+    return pygame.font.Font(None, size)
+
+
+@functools.lru_cache(maxsize=1024)
+def text(string, size, color):
+    """Antialiased rendering of string, memoized by (string, size, colour)"""
+    return font(size).render(string, True, color)
+
+
+def clear():
+    """Drop every cached asset, required after pygame.quit() invalidated them"""
+    font.cache_clear()
+    text.cache_clear()
+    frames.clear()
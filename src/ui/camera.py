@@ -0,0 +1,67 @@
+import pygame
+
+from src.game.constants import CELL_SIZE
+
+# Fraction of the window on each side that the target may enter before the view scrolls
+DEAD_ZONE = 0.3
+
+
+class Camera:
+    """Window-sized view of a board that scrolls to keep a target in the middle part of the window
+
+    Coordinates are pixels of the whole board. The view only moves once the
+    target comes closer than dead_zone of the window to an edge, and never
+    past the edges of the board, so a board that fits the window never scrolls.
+    """
+
+    def __init__(self, view_size, board_size, dead_zone=DEAD_ZONE):
+        self.width, self.height = view_size
+        self.board_width, self.board_height = board_size
+        self.dead_zone = dead_zone
+        self.x = 0
+        self.y = 0
+
+    @classmethod
+    def for_board(cls, screen, game_map, dead_zone=DEAD_ZONE):
+        return cls(screen.get_size(), (game_map.width * CELL_SIZE, game_map.height * CELL_SIZE), dead_zone)
+
+    @property
+    def scrolls(self):
+        """Whether the board is larger than the window in either direction"""
+        return self.board_width > self.width or self.board_height > self.height
+
+    @property
+    def rect(self):
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+    def _axis(self, offset, target, view, board):
+        if board <= view:
+            return 0
+        margin = int(view * self.dead_zone)
+        if target - offset < margin:
+            offset = target - margin
+        elif target - offset > view - margin:
+            offset = target - view + margin
+        return min(max(offset, 0), board - view)
+
+    def follow(self, px, py):
+        """Scroll just enough to bring the board pixel (px, py) out of the dead zone; returns whether it moved"""
+        x = self._axis(self.x, round(px), self.width, self.board_width)
+        y = self._axis(self.y, round(py), self.height, self.board_height)
+        moved = (x, y) != (self.x, self.y)
+        self.x, self.y = x, y
+        return moved
+
+    def center_on(self, px, py):
+        """Jump to (px, py), e.g. for a new game, as far as the board edges allow"""
+        x = min(max(round(px) - self.width // 2, 0), max(self.board_width - self.width, 0))
+        y = min(max(round(py) - self.height // 2, 0), max(self.board_height - self.height, 0))
+        moved = (x, y) != (self.x, self.y)
+        self.x, self.y = x, y
+        return moved
+
+    def visible_cells(self):
+        """Cell range x0, y0, x1, y1 (exclusive ends) that intersects the view"""
+        return (self.x // CELL_SIZE, self.y // CELL_SIZE,
+                min(-(-(self.x + self.width) // CELL_SIZE), self.board_width // CELL_SIZE),
+                min(-(-(self.y + self.height) // CELL_SIZE), self.board_height // CELL_SIZE))
@@ -0,0 +1,75 @@
+import pygame
+
+from src.entities.ghost import Ghost
+from src.game.constants import CELL_SIZE, BLACK, BLUE, WHITE, YELLOW, GHOST_COLORS
+
+# Longest side of the minimap in pixels
+MINIMAP_SIZE = 160
+MINIMAP_BORDER = (128, 128, 128)
+
+
+class Minimap:
+    """Whole-board overview in a corner of the window: walls, entities and the camera's view
+
+    Each minimap pixel stands for a block of cells and is shaded by the share
+    of walls in it. The shaded surface is built once per board with NumPy and
+    only the blocks of toggled walls are recomputed, so drawing it is one blit
+    plus a dot per entity, whatever the size of the board.
+    """
+
+    def __init__(self, screen, game_map, size=MINIMAP_SIZE, margin=4):
+        import numpy as np
+
+        self.screen = screen
+        self.margin = margin
+        self.width = game_map.width
+        # Cells per minimap pixel along both axes
+        self.block = max(-(-max(game_map.width, game_map.height) // size), 1)
+        block = self.block
+        rows, columns = -(-game_map.height // block), -(-game_map.width // block)
+        walls = np.zeros((rows * block, columns * block), dtype=np.float32)
+        walls[:game_map.height, :game_map.width] = np.frombuffer(game_map.walls, dtype=np.uint8).reshape(
+            game_map.height, game_map.width) != 0
+        share = walls.reshape(rows, block, columns, block).mean(axis=(1, 3))
+        pixels = np.zeros((columns, rows, 3), dtype=np.uint8)
+        for channel in range(3):
+            pixels[..., channel] = (share.T * BLUE[channel]).astype(np.uint8)
+        self.surface = pygame.surfarray.make_surface(pixels).convert(screen)
+        self.position = (screen.get_width() - columns - margin, margin)
+        self.walls_seen = len(game_map.wall_changes)
+
+    @property
+    def rect(self):
+        return pygame.Rect(self.position[0] - 1, self.position[1] - 1,
+                           self.surface.get_width() + 2, self.surface.get_height() + 2)
+
+    def _shade(self, game_map, x, y):
+        """Recompute the pixel of the block holding cell (x, y)"""
+        block = self.block
+        bx, by = x // block, y // block
+        cells = walls = 0
+        for cy in range(by * block, min((by + 1) * block, game_map.height)):
+            for cx in range(bx * block, min((bx + 1) * block, game_map.width)):
+                cells += 1
+                walls += game_map.is_wall(cx, cy)
+        self.surface.set_at((bx, by), tuple(int(value * walls / block ** 2) for value in BLUE) if cells else BLACK)
+
+    def draw(self, game_map, view, entities):
+        """Draw the minimap with entities given as (x, y, entity) cells and return the screen rect it covers"""
+        for x, y in game_map.wall_changes[self.walls_seen:]:
+            self._shade(game_map, x, y)
+        self.walls_seen = len(game_map.wall_changes)
+
+        screen = self.screen
+        left, top = self.position
+        block = self.block
+        screen.blit(self.surface, self.position)
+        for x, y, entity in entities:
+            color = GHOST_COLORS[entity.personality] if isinstance(entity, Ghost) else YELLOW
+            screen.fill(color, (left + x // block - 1, top + y // block - 1, 3, 3))
+        scale = CELL_SIZE * block
+        pygame.draw.rect(screen, WHITE, (left + view.x // scale, top + view.y // scale,
+                                         max(view.width // scale, 1), max(view.height // scale, 1)), 1)
+        rect = self.rect
+        pygame.draw.rect(screen, MINIMAP_BORDER, rect, 1)
+        return rect.clip(screen.get_rect())
@@ -0,0 +1,51 @@
+import pygame
+
+from src.game.constants import WHITE, YELLOW
+from src.ui import assets
+
+OVERLAY_BG = (0, 0, 0, 190)
+# The text is re-rendered this many frames apart, the cached surface is blitted in between
+REFRESH_FRAMES = 15
+
+
+class ProfilerOverlay:
+    """Corner panel with the rolling percentiles of a FrameProfiler"""
+
+    def __init__(self, profiler, position=(4, 4)):
+        self.profiler = profiler
+        self.position = position
+        self.font = assets.font(18)
+        self.surface = None
+        self.frames = 0
+
+    def _lines(self):
+        lines = [('phase            p50     p95     p99     max  (ms)', YELLOW)]
+        for name, p50, p95, p99, worst in self.profiler.summary():
+            if name in ('pathfinder_calls', 'nodes_expanded'):
+                lines.append((f"{name:16} {p50:7.0f} {p95:7.0f} {p99:7.0f} {worst:7.0f}", WHITE))
+            else:
+                lines.append((f"{name:16} {p50 * 1e3:7.2f} {p95 * 1e3:7.2f} {p99 * 1e3:7.2f} {worst * 1e3:7.2f}",
+                              WHITE))
+        busiest = sorted(self.profiler.last_searches.items(), key=lambda item: item[1][1], reverse=True)[:3]
+        for ghost, (calls, expanded) in busiest:
+            lines.append((f"ghost {ghost}: {calls} calls, {expanded} nodes", WHITE))
+        return lines
+
+    def _render(self):
+        rendered = [self.font.render(text, True, color) for text, color in self._lines()]
+        width = max(line.get_width() for line in rendered) + 8
+        height = sum(line.get_height() for line in rendered) + 8
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill(OVERLAY_BG)
+        y = 4
+        for line in rendered:
+            surface.blit(line, (4, y))
+            y += line.get_height()
+        return surface
+
+    def draw(self, screen):
+        """Draw the panel and return the screen rect it covers"""
+        if self.surface is None or self.frames % REFRESH_FRAMES == 0:
+            self.surface = self._render()
+        self.frames += 1
+        return screen.blit(self.surface, self.position)
@@ -0,0 +1,210 @@
+from collections import OrderedDict
+
+import pygame
+
+from src.entities.ghost import Ghost
+from src.game.constants import CELL_SIZE, BLACK, BLUE, WHITE, YELLOW, GHOST_COLORS
+from src.ui.camera import Camera
+from src.ui.minimap import Minimap
+
+# Background chunks are CHUNK_CELLS x CHUNK_CELLS cells, painted when first seen
+CHUNK_CELLS = 16
+# Chunks kept painted, a few windows' worth; the least recently drawn ones are dropped beyond this
+CHUNK_LIMIT = 64
+
+
+class MapRenderer:
+    """Draws the part of the board under a Camera from cached background chunks, redrawing only what changed
+
+    Walls and dots are painted into chunk surfaces of CHUNK_CELLS cells the
+    first time a chunk is in view, and Pac-Man and the ghosts are pre-rendered
+    cell-sized sprites. While the camera stands still the cells to repaint are
+    the ones covered by sprites in the previous frame plus those of the current
+    one; a scroll blits the handful of chunks under the window. Sprites outside
+    the window are skipped, so a frame costs the window's cells and not the
+    board's. Eaten dots (DotLayer.changes) and walls toggled with Grid.set_wall
+    are repainted in their chunk cell by cell, and the cell the player occupies
+    is repainted every frame, since the interpolated sprite may not cover it yet.
+
+    Boards larger than the window get a Minimap in the top-right corner.
+    """
+
+    def __init__(self, screen, game_map, camera=None):
+        self.screen = screen
+        self.camera = camera or Camera.for_board(screen, game_map)
+
+        self.atlas = {'dot': self._sprite(WHITE, CELL_SIZE // 6), 'player': self._sprite(YELLOW, CELL_SIZE // 2)}
+        for personality, color in GHOST_COLORS.items():
+            self.atlas[personality] = self._sprite(color, CELL_SIZE // 2)
+
+        self.chunks = OrderedDict()
+        self.previous_cells = set()
+        self.damaged = set()
+        self.full_redraw = True
+        self.minimap = None
+        self.show_minimap = self.camera.scrolls
+        self._reset(game_map)
+
+    def _reset(self, game_map):
+        """Start over on a new board, e.g. the next game"""
+        self.game_map = game_map
+        self.walls_seen = len(game_map.wall_changes)
+        self.dots_seen = len(game_map.dots.changes)
+        self.chunks.clear()
+        self.minimap = None
+        self.full_redraw = True
+        player = next((entity for entities in game_map.occupancy.cells.values() for entity in entities
+                       if not isinstance(entity, Ghost)), None)
+        if player is not None:
+            self.camera.center_on(player.x * CELL_SIZE + CELL_SIZE // 2, player.y * CELL_SIZE + CELL_SIZE // 2)
+
+    def _sprite(self, color, radius):
+        sprite = pygame.Surface((CELL_SIZE, CELL_SIZE), 0, self.screen)
+        sprite.fill(BLACK)
+        pygame.draw.circle(sprite, color, (CELL_SIZE // 2, CELL_SIZE // 2), radius)
+        # Transparent corners, so a sprite between two cells does not blank out its neighbours
+        sprite.set_colorkey(BLACK)
+        return sprite
+
+    def _chunk(self, cx, cy):
+        """Background surface of chunk (cx, cy), painted on first use"""
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            self.chunks.move_to_end((cx, cy))
+            return chunk
+        chunk = pygame.Surface((CHUNK_CELLS * CELL_SIZE, CHUNK_CELLS * CELL_SIZE), 0, self.screen)
+        chunk.fill(BLACK)
+        game_map = self.game_map
+        dot = self.atlas['dot']
+        left, top = cx * CHUNK_CELLS, cy * CHUNK_CELLS
+        for y in range(top, min(top + CHUNK_CELLS, game_map.height)):
+            row = y * game_map.width
+            for x in range(left, min(left + CHUNK_CELLS, game_map.width)):
+                position = ((x - left) * CELL_SIZE, (y - top) * CELL_SIZE)
+                if game_map.walls[row + x]:
+                    chunk.fill(BLUE, (position, (CELL_SIZE, CELL_SIZE)))
+                elif game_map.has_dot(x, y):
+                    chunk.blit(dot, position)
+        self.chunks[(cx, cy)] = chunk
+        if len(self.chunks) > CHUNK_LIMIT:
+            self.chunks.popitem(last=False)
+        return chunk
+
+    def _repaint_cell(self, x, y):
+        """Bring cell (x, y) of its chunk up to the board, if that chunk is painted"""
+        chunk = self.chunks.get((x // CHUNK_CELLS, y // CHUNK_CELLS))
+        if chunk is None:
+            return
+        rect = pygame.Rect(x % CHUNK_CELLS * CELL_SIZE, y % CHUNK_CELLS * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+        if self.game_map.is_wall(x, y):
+            chunk.fill(BLUE, rect)
+        else:
+            chunk.fill(BLACK, rect)
+            if self.game_map.has_dot(x, y):
+                chunk.blit(self.atlas['dot'], rect)
+
+    @staticmethod
+    def cell_rect(x, y):
+        return pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+
+    @staticmethod
+    def covered_cells(px, py):
+        """Cells overlapped by a cell-sized sprite drawn at pixel position (px, py)"""
+        xs = range(px // CELL_SIZE, (px + CELL_SIZE - 1) // CELL_SIZE + 1)
+        ys = range(py // CELL_SIZE, (py + CELL_SIZE - 1) // CELL_SIZE + 1)
+        return [(x, y) for y in ys for x in xs]
+
+    def invalidate(self):
+        """Force a full repaint, e.g. after another screen has drawn over the window"""
+        self.full_redraw = True
+
+    def toggle_minimap(self):
+        if self.camera.scrolls:
+            self.show_minimap = not self.show_minimap
+            self.full_redraw = True
+
+    def damage(self, rect):
+        """Repaint the cells under the screen rect on the next draw, e.g. after an overlay was drawn over them"""
+        rect = rect.move(self.camera.x, self.camera.y)
+        for y in range(rect.top // CELL_SIZE, (rect.bottom - 1) // CELL_SIZE + 1):
+            for x in range(rect.left // CELL_SIZE, (rect.right - 1) // CELL_SIZE + 1):
+                self.damaged.add((x, y))
+
+    def draw(self, game_map, positions=None):
+        """Draw the frame and return the list of screen rects that need updating
+
+        positions optionally maps entities to fractional cell coordinates, as
+        returned by Simulation.positions(alpha); other entities are drawn on the
+        cell they occupy. The camera follows the player.
+        """
+        if game_map is not self.game_map:
+            self._reset(game_map)
+        else:
+            changes = game_map.wall_changes[self.walls_seen:] + game_map.dots.changes[self.dots_seen:]
+            for x, y in changes:
+                self._repaint_cell(x, y)
+                self.damaged.add((x, y))
+            self.walls_seen = len(game_map.wall_changes)
+            self.dots_seen = len(game_map.dots.changes)
+
+        # Ghosts first so that the player stays visible when sharing a cell
+        ghosts, players, cells = [], [], []
+        for (x, y), entities in game_map.occupancy.cells.items():
+            for entity in entities:
+                cells.append((x, y, entity))
+                if not isinstance(entity, Ghost):
+                    self.damaged.add((x, y))
+                if positions is not None and entity in positions:
+                    fx, fy = positions[entity]
+                    position = (round(fx * CELL_SIZE), round(fy * CELL_SIZE))
+                else:
+                    position = (x * CELL_SIZE, y * CELL_SIZE)
+                if isinstance(entity, Ghost):
+                    ghosts.append((self.atlas[entity.personality], position))
+                else:
+                    players.append((self.atlas['player'], position))
+        camera = self.camera
+        for _, (px, py) in players:
+            if camera.follow(px + CELL_SIZE // 2, py + CELL_SIZE // 2):
+                self.full_redraw = True
+
+        view = camera.rect
+        sprites = []
+        covered = set()
+        for sprite, (px, py) in ghosts + players:
+            if view.x - CELL_SIZE < px < view.right and view.y - CELL_SIZE < py < view.bottom:
+                sprites.append((sprite, (px - view.x, py - view.y)))
+                covered.update(self.covered_cells(px, py))
+
+        screen = self.screen
+        if self.full_redraw:
+            self.full_redraw = False
+            screen.fill(BLACK)
+            for cy in range(view.y // (CHUNK_CELLS * CELL_SIZE), (view.bottom - 1) // (CHUNK_CELLS * CELL_SIZE) + 1):
+                for cx in range(view.x // (CHUNK_CELLS * CELL_SIZE),
+                                (view.right - 1) // (CHUNK_CELLS * CELL_SIZE) + 1):
+                    screen.blit(self._chunk(cx, cy), (cx * CHUNK_CELLS * CELL_SIZE - view.x,
+                                                      cy * CHUNK_CELLS * CELL_SIZE - view.y))
+            dirty = [screen.get_rect()]
+        else:
+            dirty = []
+            bounds = screen.get_rect()
+            for x, y in self.previous_cells.union(covered, self.damaged):
+                rect = self.cell_rect(x, y).move(-view.x, -view.y)
+                if not rect.colliderect(bounds) or x >= game_map.width or y >= game_map.height:
+                    continue
+                area = pygame.Rect(x % CHUNK_CELLS * CELL_SIZE, y % CHUNK_CELLS * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+                screen.blit(self._chunk(x // CHUNK_CELLS, y // CHUNK_CELLS), rect, area)
+                dirty.append(rect.clip(bounds))
+
+        for sprite, position in sprites:
+            screen.blit(sprite, position)
+
+        if self.show_minimap:
+            if self.minimap is None:
+                self.minimap = Minimap(screen, game_map)
+            dirty.append(self.minimap.draw(game_map, view, cells))
+
+        self.previous_cells = covered
+        self.damaged.clear()
+        return dirty
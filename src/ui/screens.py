@@ -1,9 +1,20 @@
 import pygame
 
-from src.game.constants import WINDOW_SIZE, MENU_BG, MENU_TEXT, MENU_SELECT, LOSS_BG, LOSS_TEXT, LOSS_OPTION
+from src.game.constants import MENU_BG, MENU_TEXT, MENU_SELECT, LOSS_BG, LOSS_TEXT, LOSS_OPTION
+from src.ui import assets
+
+TITLE_SIZE = 74
+OPTION_SIZE = 50
 
 
 class Screen:
+    """Menu-style screen whose frames are composed once and then only blitted
+
+    A screen only changes with the selected option, so there is one composed
+    frame per selection, shared through the asset cache with every later
+    instance of the same screen.
+    """
+
     def __init__(self, screen, title, options, bg_color, text_color, select_color):
         self.screen = screen
         self.title = title
@@ -11,20 +22,32 @@ class Screen:
         self.bg_color = bg_color
         self.text_color = text_color
         self.select_color = select_color
-        self.font_big = pygame.font.Font(None, 74)
-        self.font_small = pygame.font.Font(None, 50)
         self.selected = 0
 
+    def frame(self, selected):
+        size = self.screen.get_size()
+        key = (self.title, tuple(self.options), self.bg_color, self.text_color, self.select_color, size, selected)
+        frame = assets.frames.get(key)
+        if frame is None:
+            width, height = size
+            frame = pygame.Surface(size, 0, self.screen)
+            frame.fill(self.bg_color)
+            title = assets.text(self.title, TITLE_SIZE, self.text_color)
+            frame.blit(title, title.get_rect(center=(width // 2, height // 4)))
+            for i, opt in enumerate(self.options):
+                color = self.select_color if i == selected else self.text_color
+                text = assets.text(opt, OPTION_SIZE, color)
+                frame.blit(text, text.get_rect(center=(width // 2, height // 2 + i * 60)))
+            assets.frames[key] = frame
+        return frame
+
+    def prepare(self):
+        """Compose every frame ahead of time, so showing the screen later costs a single blit"""
+        for i in range(len(self.options)):
+            self.frame(i)
+
     def draw(self):
-        self.screen.fill(self.bg_color)
-        title = self.font_big.render(self.title, True, self.text_color)
-        title_rect = title.get_rect(center=(WINDOW_SIZE[0] // 2, WINDOW_SIZE[1] // 4))
-        self.screen.blit(title, title_rect)
-        for i, opt in enumerate(self.options):
-            color = self.select_color if i == self.selected else self.text_color
-            text = self.font_small.render(opt, True, color)
-            rect = text.get_rect(center=(WINDOW_SIZE[0] // 2, WINDOW_SIZE[1] // 2 + i * 60))
-            self.screen.blit(text, rect)
+        self.screen.blit(self.frame(self.selected), (0, 0))
 
     def handle_input(self, event):
         if event.type == pygame.KEYDOWN:
@@ -45,3 +68,8 @@ class Menu(Screen):
 class LossScreen(Screen):
     def __init__(self, screen):
         super().__init__(screen, 'GAME OVER', ['Try Again', 'Main Menu'], LOSS_BG, LOSS_TEXT, LOSS_OPTION)
+
+
+class LevelCompleteScreen(Screen):
+    def __init__(self, screen):
+        super().__init__(screen, 'LEVEL COMPLETE', ['Play Again', 'Main Menu'], MENU_BG, MENU_SELECT, MENU_TEXT)
@@ -0,0 +1,27 @@
+from src.game.grid import Grid
+from src.game.policies import NearestDotPolicy
+from src.game.simulation import Simulation
+
+# The player starts two cells from a dot on the left and eight from one on the right
+ROWS = [
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+    [1, 2, 0, 3, 0, 0, 0, 0, 0, 0, 0, 2, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 1],
+    [1, 4, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+]
+
+
+def test_nearest_dot_policy_heads_for_a_reachable_dot_when_the_nearest_is_walled_off():
+    simulation = Simulation(Grid.from_rows(ROWS), 'dijkstra')
+    simulation.reset(0)
+    assert simulation.toggle_wall(2, 1)
+    policy = NearestDotPolicy(0)
+
+    action = policy(simulation)
+    assert action == (1, 0)
+    while simulation.game_map.has_dot(11, 1) and not simulation.done:
+        simulation.step(action)
+        action = policy(simulation)
+    assert not simulation.game_map.has_dot(11, 1)
+    assert simulation.game_map.has_dot(1, 1)
@@ -0,0 +1,42 @@
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from src.game.constants import CELL_SIZE
+from src.game.map import Map
+from src.game.policies import POLICIES
+from src.game.simulation import Simulation, EVENT_DOT_EATEN
+from src.ui.renderer import MapRenderer
+
+
+def test_incremental_frame_matches_fresh_render_while_a_dot_is_eaten():
+    pygame.display.init()
+    try:
+        simulation = Simulation(Map().grid(), 'dijkstra')
+        simulation.reset(0)
+        policy = POLICIES['greedy'](0)
+        screen = pygame.display.set_mode((simulation.game_map.width * CELL_SIZE,
+                                          simulation.game_map.height * CELL_SIZE))
+        renderer = MapRenderer(screen, simulation.game_map)
+        renderer.draw(simulation.game_map, simulation.positions())
+
+        eaten = 0
+        while eaten < 5 and not simulation.done:
+            _, events = simulation.step(policy(simulation))
+            # Right after the move the player is drawn on the cell it left, not yet over the eaten dot
+            positions = simulation.positions(0.0)
+            renderer.draw(simulation.game_map, positions)
+            if not any(event[0] == EVENT_DOT_EATEN for event in events):
+                continue
+            eaten += 1
+            player = simulation.player
+            assert positions[player] != (player.x, player.y)
+
+            reference = screen.copy()
+            MapRenderer(reference, simulation.game_map).draw(simulation.game_map, positions)
+            assert pygame.image.tobytes(screen, 'RGB') == pygame.image.tobytes(reference, 'RGB')
+        assert eaten == 5
+    finally:
+        pygame.display.quit()
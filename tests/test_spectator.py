@@ -0,0 +1,72 @@
+import asyncio
+import socket
+
+from src.game.map import Map
+from src.game.policies import POLICIES
+from src.game.simulation import Simulation
+from src.game.spectator import (SpectatorServer, SpectatorClient, FRAME, DELTA, DELTA_BYTES, SEND_BUFFER,
+                                KIND_KEYFRAME)
+
+QUEUE_LIMIT = 8
+
+
+async def _stalled_spectator():
+    simulation = Simulation(Map().grid(), 'dijkstra')
+    simulation.reset(0)
+    policy = POLICIES['greedy'](0)
+    server = SpectatorServer(queue_limit=QUEUE_LIMIT)
+    await server.start()
+    client = SpectatorClient()
+    await client.connect('127.0.0.1', server.port, receive_buffer=1024)
+    try:
+        while not server.spectators:
+            await asyncio.sleep(0.01)
+        server.publish(simulation)
+        assert await client.receive() == KIND_KEYFRAME
+        # Stop reading altogether, the client's stream reader would otherwise keep draining the socket
+        client.writer.transport.pause_reading()
+
+        # Below the queue only the transport and the two kernel buffers may hold frames, at least a bare delta each
+        spectator = next(iter(server.spectators))
+        send_buffer = spectator.writer.get_extra_info('socket').getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+        # Linux reports twice the size asked for, its bookkeeping overhead
+        assert send_buffer <= 2 * SEND_BUFFER
+        buffered = (send_buffer + client.writer.get_extra_info('socket').getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+                    + QUEUE_LIMIT * DELTA_BYTES)
+        limit = QUEUE_LIMIT + 1 + buffered // (FRAME.size + DELTA.size)
+
+        drops = []
+        ticks = 0
+        while len(drops) < 2:
+            if simulation.done:
+                simulation.reset()
+                policy = POLICIES['greedy'](simulation.seed)
+                events = []
+            else:
+                _, events = simulation.step(policy(simulation))
+            server.publish(simulation, events)
+            for _ in range(3):
+                await asyncio.sleep(0)
+            ticks += 1
+            if server.dropped > len(drops):
+                drops.append(ticks)
+            assert ticks <= limit + QUEUE_LIMIT + 1, "stalled spectator was never resynced"
+        assert drops[0] <= limit
+        # Once its buffers are full the queue alone decides, a keyframe replaces it every queue_limit ticks
+        assert drops[1] - drops[0] <= QUEUE_LIMIT + 1
+
+        # Catching up: a bounded backlog of stale frames, then the keyframe that brings it up to date
+        client.writer.transport.resume_reading()
+        server.publish(simulation)
+        stale = 0
+        while client.mismatches(simulation):
+            await asyncio.wait_for(client.receive(), 5)
+            stale += 1
+        assert stale <= drops[0] + 1
+    finally:
+        client.close()
+        await server.close()
+
+
+def test_stalled_spectator_is_resynced():
+    asyncio.run(_stalled_spectator())